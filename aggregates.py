@@ -0,0 +1,213 @@
+# aggregates.py
+
+import math
+from typing import Dict, List, Optional
+
+
+class RunningStats:
+    """Constant-memory count/mean/variance using Welford's algorithm.
+
+    Two instances built on disjoint samples can be combined with `merge`,
+    giving the same result as if every sample had been added to one.
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.min: Optional[float] = None
+        self.max: Optional[float] = None
+
+    def add(self, value: float):
+        self.count += 1
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (value - self.mean)
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = value if self.max is None else max(self.max, value)
+
+    def merge(self, other: "RunningStats"):
+        """Fold another accumulator into this one (Chan et al. parallel update)"""
+        if other.count == 0:
+            return
+        if self.count == 0:
+            self.count, self.mean, self.m2 = other.count, other.mean, other.m2
+            self.min, self.max = other.min, other.max
+            return
+
+        total = self.count + other.count
+        delta = other.mean - self.mean
+        self.mean += delta * other.count / total
+        self.m2 += other.m2 + delta * delta * self.count * other.count / total
+        self.count = total
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+
+    @property
+    def variance(self) -> float:
+        return self.m2 / (self.count - 1) if self.count > 1 else 0.0
+
+    @property
+    def std(self) -> float:
+        return math.sqrt(self.variance)
+
+    def to_dict(self) -> Dict:
+        return {"count": self.count, "mean": self.mean, "m2": self.m2, "min": self.min, "max": self.max}
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> "RunningStats":
+        stats = cls()
+        stats.count, stats.mean, stats.m2 = data["count"], data["mean"], data["m2"]
+        stats.min, stats.max = data["min"], data["max"]
+        return stats
+
+
+class QuantileSketch:
+    """Merging t-digest for streaming quantile estimates in bounded memory.
+
+    Centroids near the tails are kept small so extreme quantiles (p99) stay
+    accurate, while the middle of the distribution is compressed harder.
+    Memory is O(compression) regardless of how many values are added.
+    """
+
+    def __init__(self, compression: int = 100):
+        self.compression = compression
+        self.count = 0.0
+        self.min: Optional[float] = None
+        self.max: Optional[float] = None
+        self._centroids: List[List[float]] = []  # [mean, weight], sorted by mean
+        self._buffer: List[List[float]] = []
+
+    def add(self, value: float, weight: float = 1.0):
+        self._buffer.append([value, weight])
+        self.count += weight
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = value if self.max is None else max(self.max, value)
+        if len(self._buffer) >= 5 * self.compression:
+            self._compress()
+
+    def merge(self, other: "QuantileSketch"):
+        if other.count == 0:
+            return
+        other._compress()
+        self._buffer.extend([mean, weight] for mean, weight in other._centroids)
+        self.count += other.count
+        self.min = other.min if self.min is None else min(self.min, other.min)
+        self.max = other.max if self.max is None else max(self.max, other.max)
+        self._compress()
+
+    def _compress(self):
+        if not self._buffer:
+            return
+        points = sorted(self._centroids + self._buffer, key=lambda c: c[0])
+        self._buffer = []
+
+        merged = [list(points[0])]
+        seen = 0.0
+        for mean, weight in points[1:]:
+            current = merged[-1]
+            # k1 scale: a centroid may span at most one unit of k, which
+            # shrinks centroids towards q=0 and q=1 so tails keep resolution
+            q_left = seen / self.count
+            q_right = (seen + current[1] + weight) / self.count
+            if self._scale(q_right) - self._scale(q_left) <= 1:
+                current[0] += (mean - current[0]) * weight / (current[1] + weight)
+                current[1] += weight
+            else:
+                seen += current[1]
+                merged.append([mean, weight])
+        self._centroids = merged
+
+    def _scale(self, q: float) -> float:
+        return self.compression / (2 * math.pi) * math.asin(2 * min(max(q, 0.0), 1.0) - 1)
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Estimate the value at quantile `q` (0..1), or None if empty"""
+        self._compress()
+        if not self._centroids:
+            return None
+        if len(self._centroids) == 1:
+            return self._centroids[0][0]
+
+        target = q * self.count
+        cumulative = 0.0
+        prev_mean, prev_center = self.min, 0.0
+        for mean, weight in self._centroids:
+            center = cumulative + weight / 2
+            if target < center:
+                if center == prev_center:
+                    return mean
+                fraction = (target - prev_center) / (center - prev_center)
+                return prev_mean + fraction * (mean - prev_mean)
+            cumulative += weight
+            prev_mean, prev_center = mean, center
+
+        if cumulative == prev_center:
+            return self.max
+        fraction = (target - prev_center) / (cumulative - prev_center)
+        return prev_mean + fraction * (self.max - prev_mean)
+
+    def to_dict(self) -> Dict:
+        self._compress()
+        return {
+            "compression": self.compression,
+            "count": self.count,
+            "min": self.min,
+            "max": self.max,
+            "centroids": [list(c) for c in self._centroids],
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> "QuantileSketch":
+        sketch = cls(data["compression"])
+        sketch.count, sketch.min, sketch.max = data["count"], data["min"], data["max"]
+        sketch._centroids = [list(c) for c in data["centroids"]]
+        return sketch
+
+
+class Distribution:
+    """Moments plus quantiles for one streamed metric"""
+
+    QUANTILES = (0.5, 0.9, 0.99)
+
+    def __init__(self, compression: int = 100):
+        self.stats = RunningStats()
+        self.sketch = QuantileSketch(compression)
+
+    def add(self, value: float):
+        self.stats.add(value)
+        self.sketch.add(value)
+
+    def merge(self, other: "Distribution"):
+        self.stats.merge(other.stats)
+        self.sketch.merge(other.sketch)
+
+    @property
+    def count(self) -> int:
+        return self.stats.count
+
+    @property
+    def mean(self) -> float:
+        return self.stats.mean
+
+    def summary(self) -> Dict:
+        summary = {
+            "count": self.stats.count,
+            "mean": self.stats.mean,
+            "std": self.stats.std,
+            "min": self.stats.min,
+            "max": self.stats.max,
+        }
+        for q in self.QUANTILES:
+            summary[f"p{round(q * 100)}"] = self.sketch.quantile(q)
+        return summary
+
+    def to_dict(self) -> Dict:
+        return {"stats": self.stats.to_dict(), "sketch": self.sketch.to_dict()}
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> "Distribution":
+        dist = cls(data["sketch"]["compression"])
+        dist.stats = RunningStats.from_dict(data["stats"])
+        dist.sketch = QuantileSketch.from_dict(data["sketch"])
+        return dist
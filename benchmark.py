@@ -1,20 +1,128 @@
-from typing import Dict, Tuple, List
+from typing import Dict, Tuple, List, Optional, Union
+from aggregates import Distribution, RunningStats
+from board_deck import BoardDeck, bigram_similarity, load_words
+from budget import BudgetGuard
 from game_logger import GameLogger
 from llm_agent import LLMAgent
+from llm_providers import (
+    Deadline,
+    DeadlineExceeded,
+    HedgeStats,
+    KEY_COUNTERS,
+    NoHealthyKey,
+    RequestTimeout,
+    UsageMeter,
+    key_pool_stats
+)
+from pathlib import Path
+from tracing import span, tracer, tracing
+import copy
 import random
 
+# Provider failures that end a game early instead of crashing the matchup
+GAME_ABORT_ERRORS = (DeadlineExceeded, RequestTimeout, NoHealthyKey)
+
+def _abort_reason(error: Exception) -> str:
+    if isinstance(error, DeadlineExceeded):
+        return "game deadline exceeded"
+    if isinstance(error, NoHealthyKey):
+        return "no healthy API key"
+    return "request timeout"
+
+def _merge_key_counters(totals: Dict[str, Dict[str, int]], counters: Dict[str, Dict[str, int]]):
+    """Add per-key counters, keyed by key label, into `totals`"""
+    for label, key_counters in counters.items():
+        key_totals = totals.setdefault(label, dict.fromkeys(key_counters, 0))
+        for counter, count in key_counters.items():
+            key_totals[counter] += count
+
 class CodeNamesBenchmark:
-    def __init__(self, log_dir: str = "game_logs"):
+    def __init__(self,
+                 log_dir: str = "game_logs",
+                 seed: Optional[int] = None,
+                 deck: Optional[Union[str, BoardDeck]] = None,
+                 difficulty_index: Optional[str] = None,
+                 difficulty_strata: int = 5,
+                 trace: Optional[str] = None,
+                 game_timeout: Optional[float] = None,
+                 budget: Optional[BudgetGuard] = None,
+                 speculative_clues: int = 0):
         self.metrics = {}
+        self.aggregates = {}
         self.logger = GameLogger(log_dir)
+        self.rng = random.Random(seed)
+        self.deck = BoardDeck(deck) if isinstance(deck, str) else deck
+        if self.deck is not None and len(self.deck) == 0:
+            raise ValueError("Board deck has no boards")
+        self._deck_cursor = 0
+        self._strata: Optional[List[List[int]]] = None
+        if difficulty_index is not None:
+            if self.deck is None:
+                raise ValueError("A difficulty index requires a board deck")
+            self.deck.load_difficulty(difficulty_index)
+            self._strata = [s for s in self.deck.difficulty_strata(difficulty_strata) if s]
+        self._words: Optional[List[str]] = None
+
+        # Game ids keep counting across matchups (and past logs already in
+        # log_dir) so no game log is overwritten
+        self._next_game_id = 1 + max(
+            (int(p.stem[len("game_"):]) for p in Path(log_dir).glob("game_*.json")
+             if p.stem[len("game_"):].isdigit()),
+            default=-1
+        )
+
+        # "game" writes a Chrome trace per game, "run" one per matchup
+        if trace not in (None, "game", "run"):
+            raise ValueError(f"Unsupported trace mode: {trace}")
+        self.trace = trace
+        self.log_dir = Path(log_dir)
+
+        # Wall-clock seconds per game; calls still pending when it runs out
+        # are abandoned and the game is recorded as timed out
+        self.game_timeout = game_timeout
+        # Shared by every matchup this benchmark runs, so it caps a whole tournament
+        self.budget = budget
+        # While each guess is pending, prefetch the next codemaster's clue for
+        # this many of the likeliest ways the turn could end (0 disables)
+        self.speculative_clues = speculative_clues
+
+    def simulate_game(self,
+                      game_id: int,
+                      team_a_config: Dict,
+                      team_b_config: Dict,
+                      layout: Optional[Dict] = None,
+                      seats_swapped: bool = False,
+                      snapshot: Optional[Dict] = None) -> Dict:
+        """Simulate a game with 4 LLM instances (2v2).
+
+        `layout` fixes the board and role split (see `next_layout`); a fresh
+        random board is drawn when it is omitted. `snapshot` resumes a
+        recorded game part-way through (see `replay.build_snapshot`), so the
+        turns before it are not played again.
+        """
+        if snapshot is not None:
+            layout = snapshot["layout"]
+        # Tracing is only switched on around this benchmark's own games
+        with tracing(self.trace is not None):
+            with span("game", "game", game_id=game_id, seats_swapped=seats_swapped):
+                results = self._play_game(game_id, team_a_config, team_b_config, layout, seats_swapped, snapshot)
+        if self.trace == "game":
+            tracer.export(self.log_dir / f"trace_game_{game_id}.json")
+        return results
 
-    def simulate_game(self, game_id: int, team_a_config: Dict, team_b_config: Dict) -> Dict:
-        """Simulate a game with 4 LLM instances (2v2)."""
-        # Initialize 4 separate LLM agents
-        team_a_codemaster = LLMAgent(team_a_config)
-        team_a_guesser = LLMAgent(team_a_config)
-        team_b_codemaster = LLMAgent(team_b_config)
-        team_b_guesser = LLMAgent(team_b_config)
+    def _play_game(self,
+                   game_id: int,
+                   team_a_config: Dict,
+                   team_b_config: Dict,
+                   layout: Optional[Dict],
+                   seats_swapped: bool,
+                   snapshot: Optional[Dict] = None) -> Dict:
+        # Initialize 4 separate LLM agents, all bound by the game's deadline
+        deadline = Deadline(self.game_timeout) if self.game_timeout is not None else None
+        team_a_codemaster = LLMAgent(team_a_config, deadline)
+        team_a_guesser = LLMAgent(team_a_config, deadline)
+        team_b_codemaster = LLMAgent(team_b_config, deadline)
+        team_b_guesser = LLMAgent(team_b_config, deadline)
 
         # Set their roles
         team_a_codemaster.initialize_role("codemaster")
@@ -23,8 +131,34 @@ class CodeNamesBenchmark:
         team_b_guesser.initialize_role("guesser")
 
         # Generate board and assign words
-        board = self.generate_board()
-        team_a_words, team_b_words, neutral_words, assassin = self.split_words(board)
+        if layout is None:
+            layout = self.next_layout()
+        board = list(layout["board"])
+        team_a_words = list(layout["team_a_words"])
+        team_b_words = list(layout["team_b_words"])
+        neutral_words = list(layout["neutral_words"])
+        assassin = layout["assassin"]
+
+        self.logger.start_game(
+            game_id,
+            team_a_config["model_name"],
+            team_b_config["model_name"],
+            board,
+            team_a_words,
+            team_b_words,
+            neutral_words,
+            assassin,
+            board_index=layout.get("board_index"),
+            seats_swapped=seats_swapped,
+            board_difficulty=layout.get("difficulty"),
+            feedback_modes={
+                "Team A": team_a_guesser.feedback_mode,
+                "Team B": team_b_guesser.feedback_mode
+            },
+            forked_from=({"game_id": snapshot["source_game_id"], "turn": snapshot["turn_count"]}
+                         if snapshot is not None else None),
+            prior_turns=copy.deepcopy(snapshot["prior_turns"]) if snapshot is not None else None
+        )
 
         # Initialize game state with proper tracking of past turns
         game_state = {
@@ -37,14 +171,28 @@ class CodeNamesBenchmark:
         current_team = "A"  # Team A starts
         turn_count = 0
         game_over = False
+        timed_out = False
+        timeout_reason = None
         winner = None
+        winning_reason = "turn limit reached"
 
         # Track metrics
         team_metrics = {
-            "A": {"correct_guesses": 0, "incorrect_guesses": 0, "total_clues": 0},
-            "B": {"correct_guesses": 0, "incorrect_guesses": 0, "total_clues": 0}
+            "A": {"correct_guesses": 0, "incorrect_guesses": 0, "total_clues": 0, "guesses_per_clue": []},
+            "B": {"correct_guesses": 0, "incorrect_guesses": 0, "total_clues": 0, "guesses_per_clue": []}
         }
 
+        if snapshot is not None:
+            # Pick up where the recorded game was instead of replaying its prefix
+            team_a_words = list(snapshot["team_a_words"])
+            team_b_words = list(snapshot["team_b_words"])
+            neutral_words = list(snapshot["neutral_words"])
+            game_state["guessed_words"] = set(snapshot["guessed_words"])
+            game_state["past_turns"] = copy.deepcopy(snapshot["past_turns"])
+            team_metrics = copy.deepcopy(snapshot["team_metrics"])
+            turn_count = snapshot["turn_count"]
+            current_team = snapshot["current_team"]
+
         print(f"\nStarting game {game_id}")
         self.display_board(board, game_state["guessed_words"])
 
@@ -57,6 +205,7 @@ class CodeNamesBenchmark:
             if not current_words:
                 game_over = True
                 winner = current_team
+                winning_reason = "found all team words"
                 print(f"\nTeam {current_team} wins by finding all their words!")
                 break
 
@@ -85,6 +234,11 @@ class CodeNamesBenchmark:
                 clue_word, clue_number = clue.split('\n')
                 clue_number = int(clue_number)
                 print(f"Codemaster's clue: {clue_word} {clue_number}")
+            except GAME_ABORT_ERRORS as e:
+                timeout_reason = _abort_reason(e)
+                print(f"\nGame {game_id} ended early ({timeout_reason}): {e}")
+                timed_out = True
+                break
             except (ValueError, TypeError) as e:
                 print(f"Invalid clue format: {e}")
                 current_team = "B" if current_team == "A" else "A"
@@ -96,19 +250,47 @@ class CodeNamesBenchmark:
 
             # Guesser makes guesses
             while remaining_guesses > 0 and not game_over:
-                guess = current_guesser.make_guess(
-                    f"Team {current_team}",
-                    board, 
-                    clue_word, 
-                    clue_number, 
-                    game_state
-                )
+                if self.speculative_clues and turn_count < 20:
+                    self._speculate_next_clue(
+                        team_b_codemaster if current_team == "A" else team_a_codemaster,
+                        current_team,
+                        current_words,
+                        opposing_words,
+                        neutral_words,
+                        assassin,
+                        game_state,
+                        {
+                            "turn_number": turn_count,
+                            "team": f"Team {current_team}",
+                            "clue_word": clue_word,
+                            "clue_number": clue_number,
+                            "guesses": turn_guesses,
+                            "results": turn_results
+                        },
+                        last_guess=remaining_guesses == 1
+                    )
+                try:
+                    guess = current_guesser.make_guess(
+                        f"Team {current_team}",
+                        board, 
+                        clue_word, 
+                        clue_number, 
+                        game_state
+                    )
+                except GAME_ABORT_ERRORS as e:
+                    # Keep the guesses already made this turn in the log
+                    timeout_reason = _abort_reason(e)
+                    print(f"\nGame {game_id} ended early ({timeout_reason}): {e}")
+                    timed_out = True
+                    game_over = True
+                    break
                 
                 game_state["current_turn_guesses"].append(guess)
                 turn_guesses.append(guess)
                 print(f"Guesser's guess: {guess}")
 
                 # Process guess and record result
+                turn_over = False
                 if guess in current_words:
                     print(f"Correct guess! Found a team word.")
                     team_metrics[current_team]["correct_guesses"] += 1
@@ -119,8 +301,9 @@ class CodeNamesBenchmark:
                     if not current_words:  # Win condition
                         game_over = True
                         winner = current_team
+                        winning_reason = "found all team words"
                         print(f"\nTeam {current_team} wins by finding all their words!")
-                        break
+                        turn_over = True
 
                 elif guess == assassin:
                     print(f"Oh no! Hit the assassin word!")
@@ -128,7 +311,8 @@ class CodeNamesBenchmark:
                     turn_results.append("assassin")
                     game_over = True
                     winner = "B" if current_team == "A" else "A"
-                    break
+                    winning_reason = f"Team {current_team} hit the assassin"
+                    turn_over = True
 
                 elif guess in opposing_words:
                     print(f"Oops! Found opponent's word.")
@@ -136,7 +320,7 @@ class CodeNamesBenchmark:
                     opposing_words.remove(guess)
                     game_state["guessed_words"].add(guess)
                     turn_results.append("opponent word")
-                    break
+                    turn_over = True
 
                 elif guess in neutral_words:
                     print(f"Hit a neutral word.")
@@ -144,6 +328,21 @@ class CodeNamesBenchmark:
                     neutral_words.remove(guess)
                     game_state["guessed_words"].add(guess)
                     turn_results.append("neutral")
+                    turn_over = True
+
+                if not game_over:
+                    game_state["current_turn_successes"] = [
+                        g for g, r in zip(turn_guesses, turn_results) if r == "team word"
+                    ]
+                    game_state["current_turn_failures"] = [
+                        g for g, r in zip(turn_guesses, turn_results) if r != "team word"
+                    ]
+                    game_state["guesses_remaining"] = 0 if turn_over else remaining_guesses - 1
+                    current_guesser.receive_guess_feedback(
+                        guess, turn_results[-1], clue_word, clue_number, game_state
+                    )
+
+                if turn_over:
                     break
 
                 remaining_guesses -= 1
@@ -152,6 +351,8 @@ class CodeNamesBenchmark:
                 if remaining_guesses > 0:
                     print(f"Remaining guesses this turn: {remaining_guesses}")
 
+            team_metrics[current_team]["guesses_per_clue"].append(len(turn_guesses))
+
             # Record turn in game history
             game_state["past_turns"].append({
                 "turn_number": turn_count,
@@ -161,6 +362,17 @@ class CodeNamesBenchmark:
                 "guesses": turn_guesses,
                 "results": turn_results
             })
+            self.logger.log_turn(
+                turn_count,
+                f"Team {current_team}",
+                (team_a_config if current_team == "A" else team_b_config)["model_name"],
+                clue_word,
+                clue_number,
+                turn_guesses,
+                [g for g, r in zip(turn_guesses, turn_results) if r == "team word"],
+                list(current_words),
+                turn_results
+            )
 
             # Display board state after the turn
             self.display_board(board, game_state["guessed_words"])
@@ -169,6 +381,52 @@ class CodeNamesBenchmark:
             if not game_over:
                 current_team = "B" if current_team == "A" else "A"
 
+        if timed_out:
+            winner = None
+            winning_reason = timeout_reason
+        team_a_codemaster.discard_speculation()
+        team_b_codemaster.discard_speculation()
+
+        team_a_history = self._combine_history_stats(team_a_codemaster, team_a_guesser)
+        team_b_history = self._combine_history_stats(team_b_codemaster, team_b_guesser)
+        self.logger.end_game(
+            f"Team {winner}" if winner else None,
+            winning_reason,
+            history_compression={"Team A": team_a_history, "Team B": team_b_history},
+            timed_out=timed_out
+        )
+
+        team_a_latency = Distribution()
+        team_a_latency.merge(team_a_codemaster.call_latency)
+        team_a_latency.merge(team_a_guesser.call_latency)
+        team_b_latency = Distribution()
+        team_b_latency.merge(team_b_codemaster.call_latency)
+        team_b_latency.merge(team_b_guesser.call_latency)
+        team_a_hedging = HedgeStats()
+        team_a_hedging.merge(team_a_codemaster.llm.hedge_stats)
+        team_a_hedging.merge(team_a_guesser.llm.hedge_stats)
+        team_b_hedging = HedgeStats()
+        team_b_hedging.merge(team_b_codemaster.llm.hedge_stats)
+        team_b_hedging.merge(team_b_guesser.llm.hedge_stats)
+        team_a_usage = UsageMeter()
+        team_a_usage.merge(team_a_codemaster.usage())
+        team_a_usage.merge(team_a_guesser.usage())
+        team_b_usage = UsageMeter()
+        team_b_usage.merge(team_b_codemaster.usage())
+        team_b_usage.merge(team_b_guesser.usage())
+        team_a_single_flight = {key: team_a_codemaster.single_flight_stats()[key] +
+                                     team_a_guesser.single_flight_stats()[key]
+                                for key in ("upstream_calls", "shared_hits")}
+        team_b_single_flight = {key: team_b_codemaster.single_flight_stats()[key] +
+                                     team_b_guesser.single_flight_stats()[key]
+                                for key in ("upstream_calls", "shared_hits")}
+        team_a_api_keys = {}
+        _merge_key_counters(team_a_api_keys, team_a_codemaster.key_counters())
+        _merge_key_counters(team_a_api_keys, team_a_guesser.key_counters())
+        team_b_api_keys = {}
+        _merge_key_counters(team_b_api_keys, team_b_codemaster.key_counters())
+        _merge_key_counters(team_b_api_keys, team_b_guesser.key_counters())
+
         # Return game results...
         return {
             "team_a": {
@@ -176,17 +434,87 @@ class CodeNamesBenchmark:
                 "incorrect_guesses": team_metrics["A"]["incorrect_guesses"],
                 "words_per_clue": (team_metrics["A"]["correct_guesses"] / 
                                 team_metrics["A"]["total_clues"] if team_metrics["A"]["total_clues"] else 0),
-                "won": winner == "A"
+                "won": winner == "A",
+                "timed_out": timed_out,
+                "turns": turn_count,
+                "guesses_per_clue": team_metrics["A"]["guesses_per_clue"],
+                "call_latency": team_a_latency,
+                "hedging": team_a_hedging,
+                "usage": team_a_usage,
+                "single_flight": team_a_single_flight,
+                "api_keys": team_a_api_keys,
+                "history": team_a_history,
+                "speculation": dict(team_a_codemaster.speculation_stats)
             },
             "team_b": {
                 "correct_guesses": team_metrics["B"]["correct_guesses"],
                 "incorrect_guesses": team_metrics["B"]["incorrect_guesses"],
                 "words_per_clue": (team_metrics["B"]["correct_guesses"] / 
                                 team_metrics["B"]["total_clues"] if team_metrics["B"]["total_clues"] else 0),
-                "won": winner == "B"
+                "won": winner == "B",
+                "timed_out": timed_out,
+                "turns": turn_count,
+                "guesses_per_clue": team_metrics["B"]["guesses_per_clue"],
+                "call_latency": team_b_latency,
+                "hedging": team_b_hedging,
+                "usage": team_b_usage,
+                "single_flight": team_b_single_flight,
+                "api_keys": team_b_api_keys,
+                "history": team_b_history,
+                "speculation": dict(team_b_codemaster.speculation_stats)
             }
         }
 
+    def _speculate_next_clue(self,
+                             next_codemaster: LLMAgent,
+                             current_team: str,
+                             current_words: List[str],
+                             opposing_words: List[str],
+                             neutral_words: List[str],
+                             assassin: str,
+                             game_state: Dict,
+                             turn_entry: Dict,
+                             last_guess: bool):
+        """Prefetch the next clue for the likeliest boards after the pending guess.
+
+        Only guesses that end the turn without ending the game lead to a new
+        clue: a wrong word, or a team word on the turn's last guess. Each is
+        ranked by how closely it resembles the clue, with team words first,
+        and the top few become speculative requests.
+        """
+        outcomes = [(word, "opponent word") for word in opposing_words if len(opposing_words) > 1]
+        outcomes += [(word, "neutral") for word in neutral_words]
+        if last_guess and len(current_words) > 1:
+            outcomes += [(word, "team word") for word in current_words]
+        outcomes.sort(key=lambda outcome: (outcome[1] == "team word",
+                                           bigram_similarity(turn_entry["clue_word"], outcome[0])),
+                      reverse=True)
+
+        next_team = "B" if current_team == "A" else "A"
+        next_codemaster.discard_speculation()
+        for word, result in outcomes[:self.speculative_clues]:
+            predicted_turn = {**turn_entry,
+                              "guesses": turn_entry["guesses"] + [word],
+                              "results": turn_entry["results"] + [result]}
+            next_codemaster.speculate_clue(
+                f"Team {next_team}",
+                [w for w in opposing_words if w != word],
+                [w for w in neutral_words if w != word],
+                [w for w in current_words if w != word],
+                assassin,
+                {**game_state, "past_turns": game_state["past_turns"] + [predicted_turn]}
+            )
+
+    def _combine_history_stats(self, *agents: LLMAgent) -> Dict:
+        """Sum prompt history token counts over a team's agents"""
+        combined = {"prompts": 0, "full_tokens": 0, "tokens": 0, "max_level": 0}
+        for agent in agents:
+            for key in ["prompts", "full_tokens", "tokens"]:
+                combined[key] += agent.history_stats[key]
+            combined["max_level"] = max(combined["max_level"], agent.history_stats["max_level"])
+        combined["tokens_saved"] = combined["full_tokens"] - combined["tokens"]
+        return combined
+
     def _get_game_results(self, correct_guesses: int, incorrect_guesses: int, 
                             total_clues: int, won: bool) -> Dict:
         return {
@@ -200,17 +528,51 @@ class CodeNamesBenchmark:
         """
         Generate a random board with words.
         """
-        with open("words/default.txt", "r") as file:  # Changed path
-            words = file.read().splitlines()
-        return random.sample(words, 25)
+        if self._words is None:
+            self._words = load_words("words/default.txt")
+        return self.rng.sample(self._words, 25)
 
     def split_words(self, board: List[str]) -> Tuple[List[str], List[str], List[str], str]:
         """
         Split the board into team, neutral, opponent, and assassin words.
         """
-        random.shuffle(board)
+        self.rng.shuffle(board)
         return board[:9], board[9:17], board[17:24], board[24]
 
+    def _new_game_id(self) -> int:
+        game_id = self._next_game_id
+        self._next_game_id += 1
+        return game_id
+
+    def next_layout(self) -> Dict:
+        """
+        Draw the next board layout, from the deck if one is loaded.
+
+        With a difficulty index, successive boards cycle through the
+        difficulty strata so every run covers easy and hard boards evenly.
+        """
+        if self.deck is not None:
+            if self._strata is not None:
+                stratum = self._strata[self._deck_cursor % len(self._strata)]
+                index = self.rng.choice(stratum)
+            else:
+                index = self._deck_cursor % len(self.deck)
+                if self._deck_cursor and index == 0:
+                    print(f"Warning: all {len(self.deck)} deck boards have been played; boards will now repeat")
+            self._deck_cursor += 1
+            return self.deck.get_board(index)
+
+        board = self.generate_board()
+        team_a_words, team_b_words, neutral_words, assassin = self.split_words(board)
+        return {
+            "board_index": None,
+            "board": board,
+            "team_a_words": team_a_words,
+            "team_b_words": team_b_words,
+            "neutral_words": neutral_words,
+            "assassin": assassin,
+        }
+
     def display_board(self, board, guessed_words):
         print("\nBoard State:")
         for i in range(5):
@@ -222,52 +584,165 @@ class CodeNamesBenchmark:
     def run_matchup(self,
                     team_a_config: Dict,
                     team_b_config: Dict,
-                    num_games: int) -> Dict:
-        """Run a series of games between two teams"""
+                    num_games: int,
+                    paired: bool = False) -> Dict:
+        """Run a series of games between two teams.
+
+        With `paired=True`, each of the `num_games` boards is played twice with
+        the models swapping seats, so both sides face the same board luck.
+        Once the benchmark's budget guard trips, no further games are started
+        and each team's results are marked `stopped_early`.
+        """
+        if self.budget is not None and self.budget.max_cost is not None:
+            for config in [team_a_config, team_b_config]:
+                if not config.get("pricing"):
+                    raise ValueError(f"A cost budget needs 'pricing' for {config['model_name']}")
+
         results = {
             "team_a": {
                 "model": team_a_config["model_name"],  # Changed from "name" to "model_name"
                 "games_played": 0,
                 "wins": 0,
+                "timeouts": 0,
                 "total_correct_guesses": 0,
                 "total_incorrect_guesses": 0,
-                "average_words_per_clue": []
+                "history_tokens": 0,
+                "history_tokens_saved": 0,
+                "compression_levels": {}
             },
             "team_b": {
                 "model": team_b_config["model_name"],  # Changed from "name" to "model_name"
                 "games_played": 0,
                 "wins": 0,
+                "timeouts": 0,
                 "total_correct_guesses": 0,
                 "total_incorrect_guesses": 0,
-                "average_words_per_clue": []
+                "history_tokens": 0,
+                "history_tokens_saved": 0,
+                "compression_levels": {}
+            }
+        }
+        # Streaming accumulators keep memory constant however many games are
+        # played; they are left on self.aggregates so separate runs can merge them.
+        aggregates = {
+            team: {
+                "words_per_clue": RunningStats(),
+                "turns_per_game": Distribution(),
+                "guesses_per_clue": Distribution(),
+                "call_latency": Distribution(),
+                "hedging": HedgeStats(),
+                "usage": UsageMeter(),
+                "single_flight": {"upstream_calls": 0, "shared_hits": 0},
+                "api_keys": {}
             }
+            for team in ["team_a", "team_b"]
         }
 
-        for i in range(num_games):
-            game_results = self.simulate_game(i, team_a_config, team_b_config)
-            
-            # Update team A stats
-            results["team_a"]["games_played"] += 1
-            results["team_a"]["wins"] += 1 if game_results["team_a"]["won"] else 0
-            results["team_a"]["total_correct_guesses"] += game_results["team_a"]["correct_guesses"]
-            results["team_a"]["total_incorrect_guesses"] += game_results["team_a"]["incorrect_guesses"]
-            results["team_a"]["average_words_per_clue"].append(game_results["team_a"]["words_per_clue"])
-
-            # Update team B stats
-            results["team_b"]["games_played"] += 1
-            results["team_b"]["wins"] += 1 if game_results["team_b"]["won"] else 0
-            results["team_b"]["total_correct_guesses"] += game_results["team_b"]["correct_guesses"]
-            results["team_b"]["total_incorrect_guesses"] += game_results["team_b"]["incorrect_guesses"]
-            results["team_b"]["average_words_per_clue"].append(game_results["team_b"]["words_per_clue"])
+        if self.trace == "run":
+            tracer.clear()
+        games_started = 0
+        stopped_early = False
+        for _ in range(num_games):
+            if self._budget_exceeded():
+                stopped_early = True
+                break
+            layout = self.next_layout()
+
+            game_results = self.simulate_game(self._new_game_id(), team_a_config, team_b_config, layout)
+            self._record_game(results["team_a"], aggregates["team_a"], game_results["team_a"])
+            self._record_game(results["team_b"], aggregates["team_b"], game_results["team_b"])
+            games_started += 1
+
+            if paired:
+                if self._budget_exceeded():
+                    stopped_early = True
+                    break
+                # Same board, seats swapped: team B's model now plays side A
+                game_results = self.simulate_game(self._new_game_id(), team_b_config, team_a_config, layout,
+                                                  seats_swapped=True)
+                self._record_game(results["team_a"], aggregates["team_a"], game_results["team_b"])
+                self._record_game(results["team_b"], aggregates["team_b"], game_results["team_a"])
+                games_started += 1
 
         # Calculate final averages
         for team in ["team_a", "team_b"]:
-            results[team]["win_rate"] = results[team]["wins"] / results[team]["games_played"]
-            results[team]["average_words_per_clue"] = (
-                sum(results[team]["average_words_per_clue"]) / len(results[team]["average_words_per_clue"])
-            )
+            results[team]["win_rate"] = (results[team]["wins"] / results[team]["games_played"]
+                                         if results[team]["games_played"] else 0)
+            for level_stats in results[team]["compression_levels"].values():
+                level_stats["win_rate"] = level_stats["wins"] / level_stats["games"]
+            results[team]["average_words_per_clue"] = aggregates[team]["words_per_clue"].mean
+            results[team]["words_per_clue_std"] = aggregates[team]["words_per_clue"].std
+            for name in ["turns_per_game", "guesses_per_clue", "call_latency"]:
+                results[team][name] = aggregates[team][name].summary()
+            speculation = results[team].get("speculation")
+            if speculation is not None:
+                attempts = speculation["hits"] + speculation["misses"]
+                speculation["hit_rate"] = speculation["hits"] / attempts if attempts else 0
+                speculation["net_time_saved"] = speculation["time_saved"] - speculation["miss_delay"]
+
+        # Counters are this team's own requests in this matchup; key health
+        # (in flight, disabled, cooling down) is the pool's current state
+        current_key_pool_stats = key_pool_stats()
+        for team, config in [("team_a", team_a_config), ("team_b", team_b_config)]:
+            results[team]["usage"] = aggregates[team]["usage"].stats().get(config["model_name"])
+            if config["model_name"] in current_key_pool_stats:
+                team_keys = aggregates[team]["api_keys"]
+                results[team]["api_keys"] = [
+                    {**key, **team_keys.get(key["key"], dict.fromkeys(KEY_COUNTERS, 0))}
+                    for key in current_key_pool_stats[config["model_name"]]
+                ]
+            if config.get("hedge"):
+                results[team]["hedging"] = aggregates[team]["hedging"].summary()
+            if any(aggregates[team]["single_flight"].values()):
+                results[team]["single_flight"] = dict(aggregates[team]["single_flight"])
+
+        if self.budget is not None:
+            for team in ["team_a", "team_b"]:
+                results[team]["stopped_early"] = stopped_early
+            if stopped_early:
+                spent = self.budget.stats()
+                print(f"\nBudget reached after {games_started} games "
+                      f"(${spent['cost']:.2f}, {spent['tokens']} tokens); no further games scheduled")
 
         self.metrics = results
+        self.aggregates = aggregates
+        if self.trace == "run":
+            tracer.export(self.log_dir / "trace_run.json")
         return results
-    
-# adding a change
\ No newline at end of file
+
+    def _budget_exceeded(self) -> bool:
+        return self.budget is not None and self.budget.exceeded()
+
+    def _record_game(self, team_results: Dict, team_aggregates: Dict, game_team_results: Dict):
+        """Fold one game's results for a team into its matchup totals"""
+        team_results["games_played"] += 1
+        team_results["wins"] += 1 if game_team_results["won"] else 0
+        team_results["timeouts"] += 1 if game_team_results["timed_out"] else 0
+        team_results["total_correct_guesses"] += game_team_results["correct_guesses"]
+        team_results["total_incorrect_guesses"] += game_team_results["incorrect_guesses"]
+        team_aggregates["words_per_clue"].add(game_team_results["words_per_clue"])
+        team_aggregates["turns_per_game"].add(game_team_results["turns"])
+        for guesses in game_team_results["guesses_per_clue"]:
+            team_aggregates["guesses_per_clue"].add(guesses)
+        team_aggregates["call_latency"].merge(game_team_results["call_latency"])
+        team_aggregates["hedging"].merge(game_team_results["hedging"])
+        team_aggregates["usage"].merge(game_team_results["usage"])
+        for key, count in game_team_results["single_flight"].items():
+            team_aggregates["single_flight"][key] += count
+        _merge_key_counters(team_aggregates["api_keys"], game_team_results["api_keys"])
+
+        # Win rate per history compression level, keyed by the most compact
+        # level this team needed during the game
+        history = game_team_results["history"]
+        team_results["history_tokens"] += history["tokens"]
+        team_results["history_tokens_saved"] += history["tokens_saved"]
+        level_stats = team_results["compression_levels"].setdefault(history["max_level"], {"games": 0, "wins": 0})
+        level_stats["games"] += 1
+        level_stats["wins"] += 1 if game_team_results["won"] else 0
+
+        if self.speculative_clues:
+            speculation = team_results.setdefault(
+                "speculation", {"launched": 0, "hits": 0, "misses": 0, "discarded": 0,
+                                "time_saved": 0.0, "miss_delay": 0.0})
+            for key in speculation:
+                speculation[key] += game_team_results["speculation"][key]
@@ -0,0 +1,187 @@
+# board_deck.py
+
+import mmap
+import random
+import struct
+import sys
+from array import array
+from pathlib import Path
+from typing import Dict, List, Optional, Set
+
+BOARD_SIZE = 25
+
+# Role codes stored per board cell. Team A always starts and holds 9 words,
+# matching the split used by CodeNamesBenchmark.split_words.
+ROLE_TEAM_A = 0
+ROLE_TEAM_B = 1
+ROLE_NEUTRAL = 2
+ROLE_ASSASSIN = 3
+ROLE_COUNTS = ((ROLE_TEAM_A, 9), (ROLE_TEAM_B, 8), (ROLE_NEUTRAL, 7), (ROLE_ASSASSIN, 1))
+
+DECK_MAGIC = b"CNDK"
+DECK_VERSION = 1
+# magic, version, board count, seed, word blob length
+HEADER_FORMAT = "<4sHIQI"
+HEADER_SIZE = struct.calcsize(HEADER_FORMAT)
+# 25 little-endian uint16 word indices followed by 25 uint8 role codes
+RECORD_FORMAT = f"<{BOARD_SIZE}H{BOARD_SIZE}B"
+RECORD_SIZE = struct.calcsize(RECORD_FORMAT)
+
+# Difficulty index written by board_difficulty.py: one float32 per deck board
+INDEX_MAGIC = b"CNDI"
+INDEX_VERSION = 1
+# magic, version, board count, deck seed, rollouts per board
+INDEX_HEADER_FORMAT = "<4sHIQI"
+INDEX_HEADER_SIZE = struct.calcsize(INDEX_HEADER_FORMAT)
+
+
+def load_words(path: str = "words/default.txt") -> List[str]:
+    """Load a word list, one word per line"""
+    with open(path, "r") as file:
+        return [word for word in file.read().splitlines() if word]
+
+
+def word_bigrams(word: str) -> Set[str]:
+    """Lowercased character bigrams of a word (the word itself if too short)"""
+    word = word.lower()
+    return {word[i:i + 2] for i in range(len(word) - 1)} or {word}
+
+
+def bigram_similarity(a: str, b: str) -> float:
+    """Character-bigram Jaccard similarity, a cheap stand-in for relatedness.
+
+    board_difficulty.word_similarity computes the same score for every pair
+    of a word list at once.
+    """
+    a_grams, b_grams = word_bigrams(a), word_bigrams(b)
+    return len(a_grams & b_grams) / len(a_grams | b_grams)
+
+
+def build_deck(path: str,
+               num_boards: int,
+               seed: int,
+               words_path: str = "words/default.txt") -> "BoardDeck":
+    """Generate a seeded deck of boards and write it to disk.
+
+    The same seed and word list always produce a byte-identical deck.
+    """
+    words = load_words(words_path)
+    if len(words) < BOARD_SIZE:
+        raise ValueError(f"Word list needs at least {BOARD_SIZE} words, got {len(words)}")
+    if len(words) > 0xFFFF:
+        raise ValueError("Word list too large for 16-bit word indices")
+
+    rng = random.Random(seed)
+    roles = [role for role, count in ROLE_COUNTS for _ in range(count)]
+    word_blob = "\n".join(words).encode("utf-8")
+
+    with open(path, "wb") as f:
+        f.write(struct.pack(HEADER_FORMAT, DECK_MAGIC, DECK_VERSION, num_boards, seed, len(word_blob)))
+        f.write(word_blob)
+        for _ in range(num_boards):
+            indices = rng.sample(range(len(words)), BOARD_SIZE)
+            board_roles = roles.copy()
+            rng.shuffle(board_roles)
+            f.write(struct.pack(RECORD_FORMAT, *indices, *board_roles))
+
+    return BoardDeck(path)
+
+
+class BoardDeck:
+    """Read-only, memory-mapped deck of precomputed boards.
+
+    Boards are decoded on demand from the mapped file, so any number of
+    processes opening the same deck share a single copy in the page cache.
+    """
+
+    def __init__(self, path: str):
+        self.path = Path(path)
+        self._file = open(self.path, "rb")
+        self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, version, num_boards, seed, blob_len = struct.unpack_from(HEADER_FORMAT, self._mmap, 0)
+        if magic != DECK_MAGIC:
+            raise ValueError(f"{path} is not a board deck")
+        if version != DECK_VERSION:
+            raise ValueError(f"Unsupported board deck version: {version}")
+
+        self.num_boards = num_boards
+        self.seed = seed
+        self.words = self._mmap[HEADER_SIZE:HEADER_SIZE + blob_len].decode("utf-8").split("\n")
+        self._records_offset = HEADER_SIZE + blob_len
+
+        expected_size = self._records_offset + num_boards * RECORD_SIZE
+        if len(self._mmap) < expected_size:
+            raise ValueError(f"Board deck {path} is truncated")
+
+        self.difficulty: Optional[array] = None
+
+    def __len__(self) -> int:
+        return self.num_boards
+
+    def load_difficulty(self, path: str):
+        """Attach a difficulty index built for this deck"""
+        with open(path, "rb") as f:
+            magic, version, num_boards, seed, _ = struct.unpack(INDEX_HEADER_FORMAT, f.read(INDEX_HEADER_SIZE))
+            if magic != INDEX_MAGIC or version != INDEX_VERSION:
+                raise ValueError(f"{path} is not a board difficulty index")
+            if num_boards != self.num_boards or seed != self.seed:
+                raise ValueError(f"Difficulty index {path} was built for a different deck")
+            scores = array("f")
+            scores.frombytes(f.read(num_boards * scores.itemsize))
+            if sys.byteorder == "big":
+                scores.byteswap()
+        self.difficulty = scores
+
+    def difficulty_strata(self, num_strata: int) -> List[List[int]]:
+        """Split board indices into `num_strata` equal-sized bands, easiest first"""
+        if self.difficulty is None:
+            raise ValueError("No difficulty index loaded")
+        ordered = sorted(range(self.num_boards), key=lambda i: self.difficulty[i])
+        return [ordered[i * self.num_boards // num_strata:(i + 1) * self.num_boards // num_strata]
+                for i in range(num_strata)]
+
+    def close(self):
+        self._mmap.close()
+        self._file.close()
+
+    def get_board(self, index: int) -> Dict:
+        """Decode board `index` into its display order and role split.
+
+        Returns fresh lists on every call, so callers may mutate them.
+        """
+        if not 0 <= index < self.num_boards:
+            raise IndexError(f"Board {index} out of range for deck of {self.num_boards}")
+
+        fields = struct.unpack_from(RECORD_FORMAT, self._mmap, self._records_offset + index * RECORD_SIZE)
+        board = [self.words[i] for i in fields[:BOARD_SIZE]]
+        roles = fields[BOARD_SIZE:]
+
+        team_a_words = [w for w, r in zip(board, roles) if r == ROLE_TEAM_A]
+        team_b_words = [w for w, r in zip(board, roles) if r == ROLE_TEAM_B]
+        neutral_words = [w for w, r in zip(board, roles) if r == ROLE_NEUTRAL]
+        assassin = next(w for w, r in zip(board, roles) if r == ROLE_ASSASSIN)
+
+        return {
+            "board_index": index,
+            "board": board,
+            "team_a_words": team_a_words,
+            "team_b_words": team_b_words,
+            "neutral_words": neutral_words,
+            "assassin": assassin,
+            "difficulty": self.difficulty[index] if self.difficulty is not None else None,
+        }
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Build a seeded Codenames board deck")
+    parser.add_argument("output", help="Path of the deck file to write")
+    parser.add_argument("--boards", type=int, default=1000, help="Number of boards to generate")
+    parser.add_argument("--seed", type=int, default=0, help="Random seed")
+    parser.add_argument("--words", default="words/default.txt", help="Word list to draw from")
+    args = parser.parse_args()
+
+    deck = build_deck(args.output, args.boards, args.seed, args.words)
+    print(f"Wrote {len(deck)} boards (seed {deck.seed}) to {args.output}")
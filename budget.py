@@ -0,0 +1,252 @@
+# budget.py
+
+import math
+import random
+from typing import Dict, List, Optional
+
+from board_deck import load_words
+from llm_providers import call_cost, usage_totals
+from prompts import (
+    CODEMASTER_SYSTEM_PROMPT,
+    GUESSER_SYSTEM_PROMPT,
+    GUESSER_FEEDBACK_PROMPT,
+    estimate_tokens,
+    format_game_history,
+    get_codemaster_prompt,
+    get_guesser_prompt,
+    render_history,
+)
+
+# Seconds per provider call assumed when a config has no "expected_latency"
+DEFAULT_LATENCY = 2.0
+
+# max_tokens the agents request; planned output is counted at these ceilings
+CLUE_MAX_TOKENS = 20
+GUESS_MAX_TOKENS = 10
+
+
+class BudgetGuard:
+    """Stops a run from scheduling new games once spend or tokens hit a ceiling.
+
+    Usage is measured from when the guard is created, using the per-model
+    counters in `llm_providers`. The game in progress when the ceiling is
+    crossed is allowed to finish.
+    """
+
+    def __init__(self, max_cost: Optional[float] = None, max_tokens: Optional[int] = None):
+        self.max_cost = max_cost
+        self.max_tokens = max_tokens
+        self.baseline = usage_totals()
+
+    def spent(self) -> Dict:
+        totals = usage_totals()
+        return {
+            "tokens": totals["tokens"] - self.baseline["tokens"],
+            "cost": totals["cost"] - self.baseline["cost"],
+        }
+
+    def exceeded(self) -> bool:
+        spent = self.spent()
+        return ((self.max_cost is not None and spent["cost"] >= self.max_cost) or
+                (self.max_tokens is not None and spent["tokens"] >= self.max_tokens))
+
+    def stats(self) -> Dict:
+        return {"max_cost": self.max_cost, "max_tokens": self.max_tokens, **self.spent()}
+
+
+def _role_budget(config: Dict, role: str) -> Optional[int]:
+    # Mirrors LLMAgent.initialize_role
+    budget = config.get("history_token_budget")
+    return budget.get(role) if isinstance(budget, dict) else budget
+
+
+def _requests_per_minute(config: Dict) -> Optional[int]:
+    """A model's overall request limit; a key pool's limits add up across its keys"""
+    endpoints = config.get("endpoints") or [{} for _ in config.get("api_keys", [])]
+    if not endpoints:
+        return config.get("requests_per_minute")
+    limits = [e.get("requests_per_minute", config.get("requests_per_minute")) for e in endpoints]
+    return None if None in limits else sum(limits)
+
+
+def _system_prompt(config: Dict, role: str) -> str:
+    default = CODEMASTER_SYSTEM_PROMPT if role == "codemaster" else GUESSER_SYSTEM_PROMPT
+    return config.get(f"{role}_system_prompt", default)
+
+
+def _plan_game(configs: Dict[str, Dict],
+               words: List[str],
+               rng: random.Random,
+               turns_per_game: int,
+               guesses_per_clue: float,
+               speculative_clues: int = 0) -> Dict[str, Dict]:
+    """Build every prompt of one representative game and count its tokens per team.
+
+    The game is scripted rather than played: each turn the guesser makes
+    `guesses_per_clue` calls on average, revealing one of its team's words
+    while more than one is left and a neutral word otherwise, so the board
+    and history grow the way a real game's do without ending early. With
+    `speculative_clues`, every guess also bills that many background clue
+    requests to the other team's codemaster, the most a real game sends.
+    """
+    board = rng.sample(words, 25)
+    remaining = {"A": board[:9], "B": board[9:17]}
+    neutral_words, assassin = board[17:24], board[24]
+    game_state = {"guessed_words": set(), "current_turn_guesses": [], "guesses_remaining": 0, "past_turns": []}
+    usage = {team: {"calls": 0, "input_tokens": 0, "output_tokens": 0, "call_seconds": 0.0, "background_calls": 0}
+             for team in configs}
+    pending_feedback = {team: [] for team in configs}
+    clue_number = max(1, round(guesses_per_clue))
+
+    def count(team: str, role: str, prompt: str, max_tokens: int, background: bool = False):
+        config = configs[team]
+        usage[team]["calls"] += 1
+        usage[team]["input_tokens"] += estimate_tokens(_system_prompt(config, role)) + estimate_tokens(prompt)
+        usage[team]["output_tokens"] += max_tokens
+        if background:
+            usage[team]["background_calls"] += 1
+        else:
+            latency = config.get("expected_latency", DEFAULT_LATENCY)
+            usage[team]["call_seconds"] += max(latency, config.get("min_delay", 0.5))
+
+    for turn in range(1, turns_per_game + 1):
+        team = "A" if turn % 2 else "B"
+        other = "B" if team == "A" else "A"
+        config = configs[team]
+
+        history = render_history(game_state["past_turns"], _role_budget(config, "codemaster")).text
+        count(team, "codemaster",
+              get_codemaster_prompt(f"Team {team}", remaining[team], neutral_words, remaining[other],
+                                    assassin, game_state, history=history),
+              CLUE_MAX_TOKENS)
+
+        # Spread fractional averages across turns, e.g. 1.5 -> 1, 2, 1, 2, ...
+        num_guesses = max(1, math.floor(turn * guesses_per_clue) - math.floor((turn - 1) * guesses_per_clue))
+        game_state["current_turn_guesses"] = []
+        turn_guesses, turn_results = [], []
+        for i in range(num_guesses):
+            game_state["guesses_remaining"] = clue_number + 1 - i
+            # Mirrors CodeNamesBenchmark._play_game, which stops speculating near its turn cap
+            if speculative_clues and turn < 20:
+                predicted_turn = {"turn_number": turn, "team": f"Team {team}", "clue_word": "clue",
+                                  "clue_number": clue_number, "guesses": turn_guesses + ["guess"],
+                                  "results": turn_results + ["neutral"]}
+                history = render_history(game_state["past_turns"] + [predicted_turn],
+                                         _role_budget(configs[other], "codemaster")).text
+                prompt = get_codemaster_prompt(f"Team {other}", remaining[other], neutral_words, remaining[team],
+                                               assassin, game_state, history=history)
+                for _ in range(speculative_clues):
+                    count(other, "codemaster", prompt, CLUE_MAX_TOKENS, background=True)
+
+            history = render_history(game_state["past_turns"], _role_budget(config, "guesser")).text
+            count(team, "guesser",
+                  get_guesser_prompt(f"Team {team}", board, "clue", clue_number, game_state,
+                                     feedback=pending_feedback[team], history=history),
+                  GUESS_MAX_TOKENS)
+            pending_feedback[team] = []
+
+            if len(remaining[team]) > 1:
+                guess, result = remaining[team].pop(), "team word"
+            elif neutral_words:
+                guess, result = neutral_words.pop(), "neutral"
+            else:
+                guess, result = remaining[other].pop(), "opponent word"
+            game_state["guessed_words"].add(guess)
+            game_state["current_turn_guesses"].append(guess)
+            turn_guesses.append(guess)
+            turn_results.append(result)
+
+            if config.get("feedback_mode", "buffered") == "buffered":
+                pending_feedback[team].append(f"Your guess '{guess}' was: {result}")
+            else:
+                count(team, "guesser",
+                      GUESSER_FEEDBACK_PROMPT.format(
+                          guess=guess, result=result,
+                          game_history=format_game_history(game_state["past_turns"]),
+                          successful_guesses=[], unsuccessful_guesses=[],
+                          remaining_guesses=clue_number - i, clue="clue", number=clue_number),
+                      GUESS_MAX_TOKENS, background=True)
+
+        game_state["past_turns"].append({
+            "turn_number": turn,
+            "team": f"Team {team}",
+            "clue_word": "clue",
+            "clue_number": clue_number,
+            "guesses": turn_guesses,
+            "results": turn_results
+        })
+
+    return usage
+
+
+def estimate_matchup(team_a_config: Dict,
+                     team_b_config: Dict,
+                     num_games: int,
+                     paired: bool = False,
+                     turns_per_game: int = 10,
+                     guesses_per_clue: float = 2.0,
+                     game_timeout: Optional[float] = None,
+                     speculative_clues: int = 0,
+                     words_path: str = "words/default.txt",
+                     seed: int = 0) -> Dict:
+    """Project the tokens, cost and wall-clock time of `run_matchup` without calling any model.
+
+    Prompts are built with the same templates, system prompts, history
+    budgets and feedback modes the agents would use. Input tokens use the
+    local `estimate_tokens` count. Output tokens are counted at each call's
+    max_tokens, so they are an upper bound. Game length is an assumption;
+    the means of `turns_per_game` and `guesses_per_clue` from a short pilot
+    run make good values.
+
+    Cost uses each config's "pricing" ({"input": $, "output": $} per million
+    tokens) and is None for models without it. Wall-clock time adds up
+    "expected_latency" seconds per blocking call (at least "min_delay").
+    Games run one after another, each capped at `game_timeout`. A model's
+    "requests_per_minute" limit, when given, sets a floor on the total; with
+    a key pool, the limits of all its keys add up.
+
+    Pass the benchmark's `speculative_clues` to include the clue prefetches
+    it sends. Each guess is counted with the full `speculative_clues` extra
+    calls, so this is an upper bound; they run in the background and add
+    no wall-clock time beyond their share of the request limit.
+    """
+    words = load_words(words_path)
+    rng = random.Random(seed)
+    seatings = [(team_a_config, team_b_config)]
+    if paired:
+        seatings.append((team_b_config, team_a_config))
+
+    models: Dict[str, Dict] = {}
+    configs_by_model: Dict[str, Dict] = {}
+    game_seconds = 0.0
+    for side_a, side_b in seatings:
+        usage = _plan_game({"A": side_a, "B": side_b}, words, rng, turns_per_game, guesses_per_clue,
+                           speculative_clues)
+        seconds = sum(team_usage["call_seconds"] for team_usage in usage.values())
+        game_seconds += min(seconds, game_timeout) if game_timeout is not None else seconds
+
+        for team, config in [("A", side_a), ("B", side_b)]:
+            configs_by_model[config["model_name"]] = config
+            totals = models.setdefault(config["model_name"], {"calls": 0, "input_tokens": 0, "output_tokens": 0})
+            for key in totals:
+                totals[key] += usage[team][key] * num_games
+
+    total_cost = 0.0
+    wall_clock = game_seconds * num_games
+    for model_name, totals in models.items():
+        config = configs_by_model[model_name]
+        totals["cost"] = call_cost(config.get("pricing"), totals["input_tokens"], totals["output_tokens"])
+        total_cost = None if total_cost is None or totals["cost"] is None else total_cost + totals["cost"]
+        requests_per_minute = _requests_per_minute(config)
+        if requests_per_minute:
+            wall_clock = max(wall_clock, totals["calls"] * 60 / requests_per_minute)
+
+    return {
+        "games": num_games * len(seatings),
+        "models": models,
+        "total_tokens": sum(t["input_tokens"] + t["output_tokens"] for t in models.values()),
+        "total_cost": total_cost,
+        "wall_clock_seconds": wall_clock,
+        "assumptions": {"turns_per_game": turns_per_game, "guesses_per_clue": guesses_per_clue,
+                        "speculative_clues": speculative_clues},
+    }
@@ -1,9 +1,10 @@
-from dataclasses import dataclass, asdict
-from typing import List, Dict, Optional
+from dataclasses import dataclass, asdict, field
+from typing import List, Dict, Optional, Union
 import json
 import time
 from pathlib import Path
 import logging
+from tracing import span
 
 @dataclass
 class TurnLog:
@@ -16,10 +17,11 @@ class TurnLog:
     correct_guesses: List[str]
     remaining_team_words: List[str]
     time_taken: float
+    results: List[str] = field(default_factory=list)
 
 @dataclass
 class GameLog:
-    game_id: int
+    game_id: Union[int, str]
     team_a_model: str
     team_b_model: str
     start_time: float
@@ -32,6 +34,20 @@ class GameLog:
     winner: Optional[str] = None
     end_time: Optional[float] = None
     winning_reason: Optional[str] = None
+    board_index: Optional[int] = None
+    seats_swapped: bool = False
+    board_difficulty: Optional[float] = None
+    feedback_modes: Dict[str, str] = field(default_factory=dict)
+    history_compression: Dict[str, Dict] = field(default_factory=dict)
+    forked_from: Optional[Dict] = None  # {"game_id": ..., "turn": ...} for replayed forks
+    timed_out: bool = False  # Game stopped at its wall-clock deadline
+
+def load_game_log(path: Union[str, Path]) -> GameLog:
+    """Load a game log JSON file written by GameLogger.end_game"""
+    with open(path, 'r') as f:
+        data = json.load(f)
+    data['turns'] = [TurnLog(**turn) for turn in data['turns']]
+    return GameLog(**data)
 
 class GameLogger:
     def __init__(self, log_dir: str = "game_logs"):
@@ -53,15 +69,21 @@ class GameLogger:
         self.current_game: Optional[GameLog] = None
         
     def start_game(self, 
-                  game_id: int,
+                  game_id: Union[int, str],
                   team_a_model: str,
                   team_b_model: str,
                   initial_board: List[str],
                   team_a_words: List[str],
                   team_b_words: List[str],
                   neutral_words: List[str],
-                  assassin: str):
-        """Start logging a new game"""
+                  assassin: str,
+                  board_index: Optional[int] = None,
+                  seats_swapped: bool = False,
+                  board_difficulty: Optional[float] = None,
+                  feedback_modes: Optional[Dict[str, str]] = None,
+                  forked_from: Optional[Dict] = None,
+                  prior_turns: Optional[List[TurnLog]] = None):
+        """Start logging a new game, optionally continuing from recorded turns"""
         self.current_game = GameLog(
             game_id=game_id,
             team_a_model=team_a_model,
@@ -72,14 +94,29 @@ class GameLogger:
             team_b_words=team_b_words.copy(),
             neutral_words=neutral_words.copy(),
             assassin=assassin,
-            turns=[]
+            turns=[],
+            board_index=board_index,
+            seats_swapped=seats_swapped,
+            board_difficulty=board_difficulty,
+            feedback_modes=dict(feedback_modes or {}),
+            forked_from=forked_from
         )
+        self.current_game.turns.extend(prior_turns or [])
         
-        self.logger.info(f"Starting game {game_id}: {team_a_model} vs {team_b_model}")
-        self.logger.info(f"Initial board: {', '.join(initial_board)}")
-        self.logger.info(f"Team A words: {', '.join(team_a_words)}")
-        self.logger.info(f"Team B words: {', '.join(team_b_words)}")
-        self.logger.info(f"Assassin word: {assassin}")
+        with span("log_start_game", "logging", game_id=game_id):
+            self.logger.info(f"Starting game {game_id}: {team_a_model} vs {team_b_model}")
+            self.logger.info(f"Initial board: {', '.join(initial_board)}")
+            self.logger.info(f"Team A words: {', '.join(team_a_words)}")
+            self.logger.info(f"Team B words: {', '.join(team_b_words)}")
+            self.logger.info(f"Assassin word: {assassin}")
+            if board_index is not None:
+                self.logger.info(f"Deck board: {board_index}" + (" (seats swapped)" if seats_swapped else ""))
+            if board_difficulty is not None:
+                self.logger.info(f"Board difficulty: {board_difficulty:.3f}")
+            for team, mode in (feedback_modes or {}).items():
+                self.logger.info(f"{team} guesser feedback mode: {mode}")
+            if forked_from is not None:
+                self.logger.info(f"Forked from game {forked_from['game_id']} after turn {forked_from['turn']}")
 
     def log_turn(self,
                 turn_number: int,
@@ -89,7 +126,8 @@ class GameLogger:
                 clue_number: int,
                 guesses: List[str],
                 correct_guesses: List[str],
-                remaining_team_words: List[str]):
+                remaining_team_words: List[str],
+                results: Optional[List[str]] = None):
         """Log details about a single turn"""
         if not self.current_game:
             raise ValueError("No game in progress")
@@ -103,18 +141,24 @@ class GameLogger:
             guesses=guesses,
             correct_guesses=correct_guesses,
             remaining_team_words=remaining_team_words,
-            time_taken=time.time()
+            time_taken=time.time(),
+            results=list(results or [])
         )
         
         self.current_game.turns.append(turn)
         
-        self.logger.info(f"Turn {turn_number} - {team} ({model_name}):")
-        self.logger.info(f"Clue given: {clue_word} {clue_number}")
-        self.logger.info(f"Guesses made: {', '.join(guesses)}")
-        self.logger.info(f"Correct guesses: {', '.join(correct_guesses)}")
-        self.logger.info(f"Remaining team words: {', '.join(remaining_team_words)}")
+        with span("log_turn", "logging", turn=turn_number):
+            self.logger.info(f"Turn {turn_number} - {team} ({model_name}):")
+            self.logger.info(f"Clue given: {clue_word} {clue_number}")
+            self.logger.info(f"Guesses made: {', '.join(guesses)}")
+            self.logger.info(f"Correct guesses: {', '.join(correct_guesses)}")
+            self.logger.info(f"Remaining team words: {', '.join(remaining_team_words)}")
 
-    def end_game(self, winner: Optional[str], winning_reason: str):
+    def end_game(self,
+                winner: Optional[str],
+                winning_reason: str,
+                history_compression: Optional[Dict[str, Dict]] = None,
+                timed_out: bool = False):
         """End the current game and save its log"""
         if not self.current_game:
             raise ValueError("No game in progress")
@@ -122,19 +166,34 @@ class GameLogger:
         self.current_game.winner = winner
         self.current_game.end_time = time.time()
         self.current_game.winning_reason = winning_reason
+        self.current_game.history_compression = dict(history_compression or {})
+        self.current_game.timed_out = timed_out
         
-        self.logger.info(f"Game {self.current_game.game_id} ended")
-        self.logger.info(f"Winner: {winner}")
-        self.logger.info(f"Reason: {winning_reason}")
+        with span("log_end_game", "logging", game_id=self.current_game.game_id):
+            self.logger.info(f"Game {self.current_game.game_id} ended")
+            self.logger.info(f"Winner: {winner}")
+            self.logger.info(f"Reason: {winning_reason}")
+            for team, stats in self.current_game.history_compression.items():
+                self.logger.info(
+                    f"{team} history tokens: {stats['tokens']} sent, {stats['tokens_saved']} saved "
+                    f"(compression level up to {stats['max_level']})"
+                )
         
-        # Save detailed game log as JSON
-        game_log_path = self.log_dir / f"game_{self.current_game.game_id}.json"
-        with open(game_log_path, 'w') as f:
-            json.dump(asdict(self.current_game), f, indent=2)
+            # Save detailed game log as JSON
+            game_log_path = self.log_dir / f"game_{self.current_game.game_id}.json"
+            with open(game_log_path, 'w') as f:
+                json.dump(asdict(self.current_game), f, indent=2)
         
         # Clear current game
         self.current_game = None
 
+    def load_game(self, game_id: Union[int, str]) -> GameLog:
+        """Load a saved game from this logger's directory"""
+        game_log_path = self.log_dir / f"game_{game_id}.json"
+        if not game_log_path.exists():
+            raise ValueError(f"No log found for game {game_id}")
+        return load_game_log(game_log_path)
+
     def get_game_summary(self, game_id: int) -> Dict:
         """Load and summarize a specific game's log"""
         game_log_path = self.log_dir / f"game_{game_id}.json"
@@ -1,44 +1,172 @@
 # llm_agent.py
 
+from concurrent.futures import Future, ThreadPoolExecutor
 from typing import Dict, List, Optional
-from llm_providers import create_llm
+import json
+from aggregates import Distribution
+from llm_providers import BaseLLM, Deadline, DeadlineExceeded, UsageMeter, create_llm
 import time  # Added this import
+from tracing import span
 from prompts import (
     CODEMASTER_SYSTEM_PROMPT,
     GUESSER_SYSTEM_PROMPT,
     get_codemaster_prompt,
     get_guesser_prompt,
-    GUESSER_FEEDBACK_PROMPT
+    GUESSER_FEEDBACK_PROMPT,
+    format_game_history,
+    render_history
 )
 
+FEEDBACK_MODES = ("buffered", "background")
+
+# Fire-and-forget feedback requests run here so they never block a turn
+_feedback_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="feedback")
+
+# Speculative clue requests for predicted boards; results may be thrown away
+_speculation_executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix="speculate")
+
+def _report_feedback_error(future):
+    if future.exception() is not None:
+        print(f"Feedback request failed: {future.exception()}")
+
 class LLMAgent:
-    def __init__(self, model_config: Dict):
+    def __init__(self, model_config: Dict, deadline: Optional[Deadline] = None):
         """Initialize an LLM agent with specific configuration"""
         self.llm = create_llm(model_config)
+        # Second instance for requests nobody waits on; it shares this one's
+        # rate-limit slots but only takes a slot that is free right away
+        self.background_llm = create_llm(model_config)
+        self.background_llm.rate_limiter = self.llm.rate_limiter
+        self.background_llm.background = True
+        self.model_config = model_config
+        self.deadline = deadline  # Shared game deadline; calls past it raise DeadlineExceeded
         self.role: Optional[str] = None
+        self.call_latency = Distribution()  # Seconds per successful provider call
+
+        # "buffered" carries guess feedback in the next guesser prompt;
+        # "background" sends it as a request nobody waits for
+        self.feedback_mode = model_config.get("feedback_mode", "buffered")
+        if self.feedback_mode not in FEEDBACK_MODES:
+            raise ValueError(f"Unsupported feedback mode: {self.feedback_mode}")
+        self.pending_feedback: List[str] = []
+
+        # Either one budget for both roles or {"codemaster": n, "guesser": n}
+        self.history_budget_config = model_config.get("history_token_budget")
+        self.history_token_budget: Optional[int] = None
+        self.history_stats = {"prompts": 0, "full_tokens": 0, "tokens": 0, "max_level": 0}
+
+        # Clue requests started ahead of time, keyed by their exact messages
+        self.speculative_clues: Dict[str, Future] = {}
+        self.speculation_stats = {"launched": 0, "hits": 0, "misses": 0, "discarded": 0,
+                                  "time_saved": 0.0, "miss_delay": 0.0}
 
     def initialize_role(self, role: str):
         """Set the role for this LLM agent"""
         self.role = role
         self.system_prompt = (CODEMASTER_SYSTEM_PROMPT if role == 'codemaster' 
                             else GUESSER_SYSTEM_PROMPT)
+        # e.g. "codemaster_system_prompt" to try a prompt variant
+        self.system_prompt = self.model_config.get(f"{role}_system_prompt", self.system_prompt)
+        if isinstance(self.history_budget_config, dict):
+            self.history_token_budget = self.history_budget_config.get(role)
+        else:
+            self.history_token_budget = self.history_budget_config
+
+    def _render_history(self, game_state: Dict, record: bool = True) -> str:
+        """Render the game history within this role's token budget"""
+        history = render_history(game_state["past_turns"], self.history_token_budget)
+        if not record:
+            return history.text
+        self.history_stats["prompts"] += 1
+        self.history_stats["full_tokens"] += history.full_tokens
+        self.history_stats["tokens"] += history.tokens
+        self.history_stats["max_level"] = max(self.history_stats["max_level"], history.level)
+        return history.text
+
+    def llms(self) -> List[BaseLLM]:
+        """This agent's provider instances, background one included"""
+        return [self.llm, self.background_llm]
+
+    def usage(self) -> UsageMeter:
+        """Calls this agent has sent upstream so far, background ones included"""
+        usage = UsageMeter()
+        for llm in self.llms():
+            usage.merge(llm.usage)
+        return usage
 
-    def _make_request(self, messages: List[Dict], max_tokens: int) -> str:
+    def single_flight_stats(self) -> Dict[str, int]:
+        """Upstream calls and shared hits of this agent's deduplicated requests"""
+        totals = {"upstream_calls": 0, "shared_hits": 0}
+        for llm in self.llms():
+            for key, count in llm.single_flight_stats.items():
+                totals[key] += count
+        return totals
+
+    def key_counters(self) -> Dict[str, Dict[str, int]]:
+        """Per-key counters of this agent's pooled requests, by key label"""
+        totals: Dict[str, Dict[str, int]] = {}
+        for llm in self.llms():
+            # A background request may still add a key, so iterate over a copy
+            for label, counters in list(llm.key_counters.items()):
+                key_totals = totals.setdefault(label, dict.fromkeys(counters, 0))
+                for counter, count in dict(counters).items():
+                    key_totals[counter] += count
+        return totals
+
+    def _make_request(self, messages: List[Dict], max_tokens: int, llm: Optional[BaseLLM] = None) -> str:
         """Make an API request with retries"""
         max_retries = 5
         base_delay = 2.0  # Increased base delay
+        background = llm is not None
+        llm = llm or self.llm
         
         for attempt in range(max_retries):
             try:
-                return self.llm.generate(messages, max_tokens)
+                with span("llm_request", "provider", model=llm.model_name, attempt=attempt):
+                    start_time = time.time()
+                    response = llm.request(messages, max_tokens, deadline=self.deadline)
+                    # call_latency is only updated from the game thread
+                    if not background:
+                        self.call_latency.add(time.time() - start_time)
+                return response
+            except DeadlineExceeded:
+                raise
             except Exception as e:
                 if attempt == max_retries - 1:
                     raise
                 
                 # Exponential backoff with longer initial delay
                 wait_time = base_delay * (2 ** attempt)
+                # No point backing off past the game deadline
+                if self.deadline is not None and wait_time >= self.deadline.remaining():
+                    raise DeadlineExceeded(f"Game deadline of {self.deadline.seconds}s exceeded") from e
                 print(f"API Error: {str(e)}. Retrying in {wait_time}s...")
-                time.sleep(wait_time)
+                with span("retry_backoff", "provider", attempt=attempt, wait=wait_time):
+                    time.sleep(wait_time)
+
+    def _clue_messages(self,
+                       team: str,
+                       team_words: List[str],
+                       neutral_words: List[str],
+                       opponent_words: List[str],
+                       assassin: str,
+                       game_state: Dict,
+                       record: bool = True) -> List[Dict]:
+        with span("build_prompt", "agent", role=self.role):
+            prompt = get_codemaster_prompt(
+                team=team,
+                team_words=team_words,
+                neutral_words=neutral_words,
+                opponent_words=opponent_words,
+                assassin=assassin,
+                game_state=game_state,
+                history=self._render_history(game_state, record)
+            )
+
+        return [
+            {"role": "system", "content": self.system_prompt},
+            {"role": "user", "content": prompt}
+        ]
 
     def give_clue(self, 
                 team: str,
@@ -51,21 +179,72 @@ class LLMAgent:
         if self.role != 'codemaster':
             raise ValueError("This agent is not initialized as a Codemaster")
 
-        prompt = get_codemaster_prompt(
-            team=team,
-            team_words=team_words,
-            neutral_words=neutral_words,
-            opponent_words=opponent_words,
-            assassin=assassin,
-            game_state=game_state
-        )
+        messages = self._clue_messages(team, team_words, neutral_words, opponent_words, assassin, game_state)
 
-        messages = [
-            {"role": "system", "content": self.system_prompt},
-            {"role": "user", "content": prompt}
-        ]
+        # Use a speculative request only if it was made for exactly this prompt
+        speculated = bool(self.speculative_clues)
+        future = self.speculative_clues.pop(json.dumps(messages, sort_keys=True), None)
+        self.discard_speculation()
+        if future is not None:
+            needed_at = time.time()
+            try:
+                response, start_time, end_time = future.result()
+            except Exception as e:
+                print(f"Speculative clue failed: {e}")
+            else:
+                self.speculation_stats["hits"] += 1
+                self.speculation_stats["time_saved"] += max(0.0, min(end_time, needed_at) - start_time)
+                self.call_latency.add(end_time - start_time)
+                return response
+        if speculated:
+            self.speculation_stats["misses"] += 1
         
-        return self._make_request(messages, max_tokens=20)
+        waited = self.llm.wait_seconds
+        with span("give_clue", "agent", team=team):
+            response = self._make_request(messages, max_tokens=20)
+        if speculated:
+            # Speculative requests share the model's key pool, so waiting for
+            # a slot or key after a miss is the delay they may have caused
+            self.speculation_stats["miss_delay"] += self.llm.wait_seconds - waited
+        return response
+
+    def speculate_clue(self,
+                       team: str,
+                       team_words: List[str],
+                       neutral_words: List[str],
+                       opponent_words: List[str],
+                       assassin: str,
+                       game_state: Dict):
+        """Start the clue request for a predicted game state in the background.
+
+        `give_clue` uses the response if it is later asked for exactly the
+        same prompt; otherwise the response is discarded.
+        """
+        if self.role != 'codemaster':
+            raise ValueError("This agent is not initialized as a Codemaster")
+
+        messages = self._clue_messages(team, team_words, neutral_words, opponent_words, assassin,
+                                       game_state, record=False)
+        key = json.dumps(messages, sort_keys=True)
+        if key not in self.speculative_clues:
+            self.speculative_clues[key] = _speculation_executor.submit(self._speculative_request, messages)
+            self.speculation_stats["launched"] += 1
+
+    def _speculative_request(self, messages: List[Dict]):
+        # A single attempt: a failed speculation just falls back to a normal
+        # request. It runs on the background instance, so it never takes one
+        # of this agent's own rate-limit slots.
+        with span("speculative_clue", "agent"):
+            start_time = time.time()
+            response = self.background_llm.request(messages, 20, deadline=self.deadline)
+            return response, start_time, time.time()
+
+    def discard_speculation(self):
+        """Drop speculative clues that can no longer match, cancelling any not yet started"""
+        for future in self.speculative_clues.values():
+            future.cancel()
+        self.speculation_stats["discarded"] += len(self.speculative_clues)
+        self.speculative_clues = {}
 
     def make_guess(self, 
                 team: str,
@@ -77,23 +256,32 @@ class LLMAgent:
         if self.role != 'guesser':
             raise ValueError("This agent is not initialized as a Guesser")
 
+        # Buffered feedback belongs to the clue it was given for
+        if not game_state["current_turn_guesses"]:
+            self.pending_feedback = []
+
         # Filter out already guessed words
         available_words = [word for word in board if word not in game_state["guessed_words"]]
         
-        prompt = get_guesser_prompt(
-            team=team,
-            board=available_words,
-            clue=clue,
-            number=number,
-            game_state=game_state
-        )
+        with span("build_prompt", "agent", role=self.role):
+            prompt = get_guesser_prompt(
+                team=team,
+                board=available_words,
+                clue=clue,
+                number=number,
+                game_state=game_state,
+                feedback=self.pending_feedback,
+                history=self._render_history(game_state)
+            )
+        self.pending_feedback = []
 
         messages = [
             {"role": "system", "content": self.system_prompt},
             {"role": "user", "content": prompt}
         ]
         
-        guess = self._make_request(messages, max_tokens=10)
+        with span("make_guess", "agent", team=team, clue=clue):
+            guess = self._make_request(messages, max_tokens=10)
         
         # Validate the guess is from available words
         if guess not in available_words:
@@ -111,9 +299,17 @@ class LLMAgent:
         if self.role != 'guesser':
             raise ValueError("This agent is not initialized as a Guesser")
 
+        if self.feedback_mode == "buffered":
+            self.pending_feedback.append(
+                f"Your guess '{guess}' was: {result} "
+                f"({game_state.get('guesses_remaining', 0)} guesses left for '{clue} {number}')"
+            )
+            return
+
         prompt = GUESSER_FEEDBACK_PROMPT.format(
             guess=guess,
             result=result,
+            game_history=format_game_history(game_state["past_turns"]),
             successful_guesses=game_state.get("current_turn_successes", []),
             unsuccessful_guesses=game_state.get("current_turn_failures", []),
             remaining_guesses=game_state.get("guesses_remaining", 0),
@@ -125,6 +321,7 @@ class LLMAgent:
             {"role": "system", "content": self.system_prompt},
             {"role": "user", "content": prompt}
         ]
-        
-        # Don't need to wait for or process the response
-        self._make_request(messages, max_tokens=10)
\ No newline at end of file
+
+        # Nothing reads the response, so don't hold up the turn waiting for it
+        future = _feedback_executor.submit(self._make_request, messages, 10, self.background_llm)
+        future.add_done_callback(_report_feedback_error)
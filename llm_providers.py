@@ -1,53 +1,722 @@
 # llm_providers.py
 
 from abc import ABC, abstractmethod
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor, FIRST_COMPLETED, wait
+from concurrent.futures import TimeoutError as FuturesTimeoutError
+import json
+import threading
 import time
 from typing import Dict, List, Optional
+from aggregates import QuantileSketch
+from prompts import estimate_tokens
+from tracing import span
 import openai
 import google.generativeai as genai
+from google.generativeai import client as genai_client
 from anthropic import Anthropic
 
+# Worker threads for concurrent provider calls (hedged duplicates etc.)
+_executor = ThreadPoolExecutor(max_workers=32, thread_name_prefix="llm")
+
+class RequestTimeout(TimeoutError):
+    """A single provider call did not finish within its timeout"""
+
+class DeadlineExceeded(TimeoutError):
+    """A game's wall-clock deadline passed before a call could finish"""
+
+class Deadline:
+    """Wall-clock budget shared by every provider call in one game"""
+
+    def __init__(self, seconds: float):
+        self.seconds = seconds
+        self.expires_at = time.monotonic() + seconds
+
+    def remaining(self) -> float:
+        return max(0.0, self.expires_at - time.monotonic())
+
+    def expired(self) -> bool:
+        return self.remaining() <= 0
+
+    def check(self):
+        if self.expired():
+            raise DeadlineExceeded(f"Game deadline of {self.seconds}s exceeded")
+
+class HedgeStats:
+    """Hedging counters and latency sketches; mergeable across agents and runs"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.requests = 0
+        self.hedged = 0
+        self.hedge_wins = 0
+        self.primary_latency = QuantileSketch()  # What un-hedged calls would have taken
+        self.effective_latency = QuantileSketch()  # What callers actually waited
+
+    def record_request(self):
+        with self.lock:
+            self.requests += 1
+
+    def record_hedge(self):
+        with self.lock:
+            self.hedged += 1
+
+    def record_primary(self, latency: float):
+        with self.lock:
+            self.primary_latency.add(latency)
+
+    def record_result(self, latency: float, hedge_won: bool):
+        with self.lock:
+            self.effective_latency.add(latency)
+            if hedge_won:
+                self.hedge_wins += 1
+
+    def merge(self, other: "HedgeStats"):
+        with other.lock:
+            requests, hedged, hedge_wins = other.requests, other.hedged, other.hedge_wins
+            primary = QuantileSketch.from_dict(other.primary_latency.to_dict())
+            effective = QuantileSketch.from_dict(other.effective_latency.to_dict())
+        with self.lock:
+            self.requests += requests
+            self.hedged += hedged
+            self.hedge_wins += hedge_wins
+            self.primary_latency.merge(primary)
+            self.effective_latency.merge(effective)
+
+    def summary(self) -> Dict:
+        with self.lock:
+            primary_p99 = self.primary_latency.quantile(0.99)
+            effective_p99 = self.effective_latency.quantile(0.99)
+            return {
+                "requests": self.requests,
+                "hedged": self.hedged,
+                "hedge_rate": self.hedged / self.requests if self.requests else 0.0,
+                "hedge_wins": self.hedge_wins,
+                "p99_unhedged": primary_p99,
+                "p99_hedged": effective_p99,
+                "p99_saved": (primary_p99 - effective_p99
+                              if primary_p99 is not None and effective_p99 is not None else None),
+            }
+
+class HedgePolicy:
+    """Tracks recent latency for one model and decides when to hedge.
+
+    A call that has not returned after the `percentile` of recent latencies
+    gets a duplicate request; at most `max_hedge_ratio` of calls are hedged,
+    so a degraded provider can't double our traffic.
+    """
+
+    def __init__(self,
+                 percentile: float = 95,
+                 min_samples: int = 20,
+                 window: int = 200,
+                 max_hedge_ratio: float = 0.1):
+        self.percentile = percentile
+        self.min_samples = min_samples
+        self.max_hedge_ratio = max_hedge_ratio
+        self.recent_latencies = deque(maxlen=window)
+        self.lock = threading.Lock()
+        self.requests = 0
+        self.hedged = 0
+        self.totals = HedgeStats()  # Lifetime counters for this policy
+
+    def hedge_delay(self) -> Optional[float]:
+        """Seconds to wait before hedging, or None until enough samples exist"""
+        with self.lock:
+            if len(self.recent_latencies) < self.min_samples:
+                return None
+            ordered = sorted(self.recent_latencies)
+        index = min(len(ordered) - 1, int(len(ordered) * self.percentile / 100))
+        return ordered[index]
+
+    def try_hedge(self) -> bool:
+        """Claim budget for one duplicate request"""
+        with self.lock:
+            if self.hedged + 1 > self.max_hedge_ratio * self.requests:
+                return False
+            self.hedged += 1
+        self.totals.record_hedge()
+        return True
+
+    def record_request(self):
+        with self.lock:
+            self.requests += 1
+        self.totals.record_request()
+
+    def record_latency(self, latency: float):
+        """Add a sample to the window the hedge threshold is taken from"""
+        with self.lock:
+            self.recent_latencies.append(latency)
+
+    def record_primary(self, latency: float):
+        self.totals.record_primary(latency)
+
+    def record_result(self, latency: float, hedge_won: bool):
+        self.totals.record_result(latency, hedge_won)
+
+    def stats(self) -> Dict:
+        return self.totals.summary()
+
+# One policy per model and hedge config, shared by every agent using both
+_hedge_policies: Dict[tuple, HedgePolicy] = {}
+_hedge_policies_lock = threading.Lock()
+
+def get_hedge_policy(model_name: str, hedge_config: Dict) -> HedgePolicy:
+    key = (model_name, json.dumps(hedge_config, sort_keys=True))
+    with _hedge_policies_lock:
+        if key not in _hedge_policies:
+            _hedge_policies[key] = HedgePolicy(**hedge_config)
+        return _hedge_policies[key]
+
+def hedge_stats() -> Dict[str, Dict]:
+    """Lifetime hedging counters per model, summed over its hedge configs"""
+    with _hedge_policies_lock:
+        policies = dict(_hedge_policies)
+    totals: Dict[str, HedgeStats] = {}
+    for (model_name, _), policy in policies.items():
+        totals.setdefault(model_name, HedgeStats()).merge(policy.totals)
+    return {model: stats.summary() for model, stats in totals.items()}
+
+class SingleFlight:
+    """Collapses identical concurrent requests into one upstream call.
+
+    The first caller for a key makes the call; callers arriving while it is
+    in flight wait for and share its result (or its exception).
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.in_flight: Dict[tuple, Future] = {}
+        self.counters: Dict[str, Dict[str, int]] = {}
+
+    def do(self, model_name: str, key: tuple, fn, timeout: Optional[float] = None,
+           caller_counters: Optional[Dict[str, int]] = None):
+        """Run `fn` once per in-flight key; `caller_counters` also gets this call's count"""
+        with self.lock:
+            counters = self.counters.setdefault(model_name, {"upstream_calls": 0, "shared_hits": 0})
+            future = self.in_flight.get(key)
+            leader = future is None
+            if leader:
+                future = Future()
+                self.in_flight[key] = future
+            outcome = "upstream_calls" if leader else "shared_hits"
+            counters[outcome] += 1
+            if caller_counters is not None:
+                caller_counters[outcome] += 1
+
+        if not leader:
+            try:
+                return future.result(timeout=timeout)
+            except RequestTimeout:
+                raise
+            except FuturesTimeoutError:
+                raise RequestTimeout(f"Shared request did not finish within {timeout:.1f}s")
+
+        try:
+            result = fn()
+            future.set_result(result)
+            return result
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self.lock:
+                del self.in_flight[key]
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        with self.lock:
+            return {model: dict(counters) for model, counters in self.counters.items()}
+
+_single_flight = SingleFlight()
+
+def single_flight_stats() -> Dict[str, Dict[str, int]]:
+    """Deduplication counters for every model that used single-flight"""
+    return _single_flight.stats()
+
+def call_cost(pricing: Optional[Dict], input_tokens: int, output_tokens: int) -> Optional[float]:
+    """Cost of a call given {"input": $, "output": $} per million tokens; None without pricing"""
+    if not pricing:
+        return None
+    return (input_tokens * pricing["input"] + output_tokens * pricing["output"]) / 1e6
+
+class UsageMeter:
+    """Counts tokens and spend per model for every call sent upstream.
+
+    Token counts are local estimates (`prompts.estimate_tokens`), the same
+    ones the pre-flight planner uses. Hedged duplicates and calls abandoned
+    at a timeout are counted because they are still billed; single-flight
+    waiters are not, because they never reach the provider.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.counters: Dict[str, Dict] = {}
+
+    def record(self, model_name: str, input_tokens: int, output_tokens: int, pricing: Optional[Dict]):
+        cost = call_cost(pricing, input_tokens, output_tokens)
+        with self.lock:
+            counters = self.counters.setdefault(
+                model_name, {"calls": 0, "input_tokens": 0, "output_tokens": 0, "cost": None})
+            counters["calls"] += 1
+            counters["input_tokens"] += input_tokens
+            counters["output_tokens"] += output_tokens
+            if cost is not None:
+                counters["cost"] = (counters["cost"] or 0.0) + cost
+
+    def merge(self, other: "UsageMeter"):
+        for model_name, counters in other.stats().items():
+            with self.lock:
+                totals = self.counters.setdefault(
+                    model_name, {"calls": 0, "input_tokens": 0, "output_tokens": 0, "cost": None})
+                for key in ("calls", "input_tokens", "output_tokens"):
+                    totals[key] += counters[key]
+                if counters["cost"] is not None:
+                    totals["cost"] = (totals["cost"] or 0.0) + counters["cost"]
+
+    def totals(self) -> Dict:
+        with self.lock:
+            return {
+                "tokens": sum(c["input_tokens"] + c["output_tokens"] for c in self.counters.values()),
+                "cost": sum(c["cost"] or 0.0 for c in self.counters.values()),
+            }
+
+    def stats(self) -> Dict[str, Dict]:
+        with self.lock:
+            return {model: dict(counters) for model, counters in self.counters.items()}
+
+_usage = UsageMeter()
+
+def usage_stats() -> Dict[str, Dict]:
+    """Estimated tokens and spend for every model called so far"""
+    return _usage.stats()
+
+def usage_totals() -> Dict:
+    """Estimated tokens and spend summed over all models"""
+    return _usage.totals()
+
+class NoHealthyKey(RuntimeError):
+    """Every key in a pool has been disabled"""
+
+# Per-key counters kept by a pool, and by each provider instance for its own calls
+KEY_COUNTERS = ("requests", "failures", "rate_limited", "auth_failures")
+
+class ApiKey:
+    """One API key/endpoint in a pool, with its quota window and health"""
+
+    def __init__(self, api_key: str, base_url: Optional[str] = None, requests_per_minute: Optional[int] = None):
+        self.api_key = api_key
+        self.base_url = base_url
+        self.requests_per_minute = requests_per_minute
+        self.label = f"...{api_key[-4:]}" + (f"@{base_url}" if base_url else "")
+        self.client = None  # Provider client, created on first use
+        self.recent = deque()  # Start times of requests in the last minute
+        self.in_flight = 0
+        self.cooldown_until = 0.0
+        self.disabled = False
+        self.counters = dict.fromkeys(KEY_COUNTERS, 0)
+
+    def remaining_quota(self, now: float) -> float:
+        while self.recent and self.recent[0] <= now - 60:
+            self.recent.popleft()
+        if self.requests_per_minute is None:
+            return float("inf")
+        return self.requests_per_minute - len(self.recent)
+
+def _key_error_kind(error: Exception) -> Optional[str]:
+    """Classify a provider error as "rate_limited", "auth" or neither (None)"""
+    status = getattr(error, "status_code", None) or getattr(error, "code", None)
+    message = str(error).lower()
+    if status == 429 or any(s in message for s in ("rate limit", "resource has been exhausted", "quota")):
+        return "rate_limited"
+    if status in (401, 403) or any(s in message for s in ("api key", "unauthorized", "permission denied")):
+        return "auth"
+    return None
+
+def _retry_after(error: Exception) -> Optional[float]:
+    headers = getattr(getattr(error, "response", None), "headers", None) or {}
+    try:
+        return float(headers.get("retry-after"))
+    except (TypeError, ValueError):
+        return None
+
+class KeyPool:
+    """Spreads one model's requests over several API keys or endpoints.
+
+    Each request goes to the healthy key with the most quota left in its
+    one-minute window (keys without a "requests_per_minute" limit count as
+    unlimited), breaking ties by fewest requests in flight. A key that is
+    rate limited cools down for `cooldown` seconds, or the provider's
+    Retry-After; a key that fails authentication is disabled for good.
+    """
+
+    def __init__(self, endpoints: List[Dict], requests_per_minute: Optional[int] = None, cooldown: float = 60.0):
+        self.keys = [ApiKey(e['api_key'], e.get('base_url'), e.get('requests_per_minute', requests_per_minute))
+                     for e in endpoints]
+        self.cooldown = cooldown
+        self.lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    def _count(self, key: ApiKey, counter: str, caller_counters: Optional[Dict[str, Dict[str, int]]]):
+        # Called under self.lock
+        key.counters[counter] += 1
+        if caller_counters is not None:
+            caller_counters.setdefault(key.label, dict.fromkeys(KEY_COUNTERS, 0))[counter] += 1
+
+    def acquire(self,
+                timeout: Optional[float] = None,
+                caller_counters: Optional[Dict[str, Dict[str, int]]] = None) -> ApiKey:
+        """Reserve a key for one request, waiting while every key is out of quota or cooling down.
+
+        Raises RequestTimeout instead of waiting more than `timeout` seconds.
+        `caller_counters` also gets this request's per-key counts.
+        """
+        if timeout is not None and timeout <= 0:
+            raise RequestTimeout("No time left to wait for an API key")
+        give_up = None if timeout is None else time.time() + timeout
+        while True:
+            with self.lock:
+                now = time.time()
+                healthy = [k for k in self.keys if not k.disabled]
+                if not healthy:
+                    raise NoHealthyKey(f"All {len(self.keys)} API keys are disabled")
+                ready = [k for k in healthy if k.cooldown_until <= now and k.remaining_quota(now) > 0]
+                if ready:
+                    key = max(ready, key=lambda k: (k.remaining_quota(now), -k.in_flight))
+                    key.recent.append(now)
+                    key.in_flight += 1
+                    self._count(key, "requests", caller_counters)
+                    return key
+                # Sleep until the first key comes out of cooldown or its window frees a slot
+                wait_until = min(max(k.cooldown_until, k.recent[0] + 60 if k.remaining_quota(now) <= 0 else now)
+                                 for k in healthy)
+            if give_up is not None and wait_until > give_up:
+                raise RequestTimeout(f"No API key is free within {timeout:.1f}s")
+            with span("key_pool_wait", "provider"):
+                time.sleep(max(wait_until - time.time(), 0.01))
+
+    def release(self,
+                key: ApiKey,
+                error: Optional[Exception] = None,
+                caller_counters: Optional[Dict[str, Dict[str, int]]] = None) -> Optional[str]:
+        """Return a key after a request; on failure, returns the error kind after updating key health"""
+        kind = _key_error_kind(error) if error is not None else None
+        with self.lock:
+            key.in_flight -= 1
+            if error is None:
+                return None
+            self._count(key, "failures", caller_counters)
+            if kind == "rate_limited":
+                self._count(key, "rate_limited", caller_counters)
+                key.cooldown_until = time.time() + (_retry_after(error) or self.cooldown)
+            elif kind == "auth":
+                self._count(key, "auth_failures", caller_counters)
+                key.disabled = True
+        if kind is not None:
+            print(f"API key {key.label} {'rate limited' if kind == 'rate_limited' else 'disabled'}: {error}")
+        return kind
+
+    def stats(self) -> List[Dict]:
+        with self.lock:
+            now = time.time()
+            return [{"key": k.label, **k.counters, "in_flight": k.in_flight,
+                     "disabled": k.disabled, "cooling_down": k.cooldown_until > now}
+                    for k in self.keys]
+
+_key_pools: Dict[tuple, KeyPool] = {}
+_key_pools_lock = threading.Lock()
+
+def get_key_pool(config: Dict) -> Optional[KeyPool]:
+    """Shared pool for a config's "endpoints" or "api_keys", or None for a single key"""
+    endpoints = config.get('endpoints') or [{'api_key': key} for key in config.get('api_keys', [])]
+    if not endpoints:
+        return None
+    pool_key = (config['type'].lower(), config['model_name'],
+                tuple((e['api_key'], e.get('base_url')) for e in endpoints))
+    with _key_pools_lock:
+        if pool_key not in _key_pools:
+            _key_pools[pool_key] = KeyPool(endpoints, config.get('requests_per_minute'),
+                                           config.get('key_cooldown', 60.0))
+        return _key_pools[pool_key]
+
+def key_pool_stats() -> Dict[str, List[Dict]]:
+    """Per-key counters and health for every model using a key pool"""
+    with _key_pools_lock:
+        pools = dict(_key_pools)
+    stats: Dict[str, List[Dict]] = {}
+    for (_, model_name, _), pool in pools.items():
+        stats.setdefault(model_name, []).extend(pool.stats())
+    return stats
+
+class RateLimiter:
+    """Request slots at least `min_delay` apart, shared by one agent's provider instances"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.last_request_time = 0.0
+
+    def reserve(self, min_delay: float, timeout: Optional[float], model_name: str) -> float:
+        """Claim the next slot, even if it is in the future, and return its start time"""
+        # Reserve under the lock so concurrent (e.g. hedged) calls share one budget
+        with self.lock:
+            current_time = time.time()
+            scheduled_time = max(current_time, self.last_request_time + min_delay)
+            if timeout is not None and scheduled_time - current_time >= timeout:
+                raise RequestTimeout(f"{model_name} has no request slot free within {timeout:.1f}s")
+            self.last_request_time = scheduled_time
+        return scheduled_time
+
+    def wait_idle(self, min_delay: float, timeout: Optional[float], model_name: str):
+        """Claim a slot only once one is free now, so calls that reserve ahead go first"""
+        give_up = None if timeout is None else time.time() + timeout
+        while True:
+            with self.lock:
+                current_time = time.time()
+                free_at = self.last_request_time + min_delay
+                if free_at <= current_time:
+                    self.last_request_time = current_time
+                    return
+            if give_up is not None and free_at >= give_up:
+                raise RequestTimeout(f"{model_name} has no request slot free within {timeout:.1f}s")
+            with span("rate_limit_wait", "provider", model=model_name, background=True):
+                time.sleep(free_at - current_time)
+
 class BaseLLM(ABC):
     def __init__(self, config: Dict):
         self.temperature = config.get('temperature', 0.7)
-        self.last_request_time = 0
-        self.min_delay = 0.5
+        self.model_name = config.get('model_name')
+        self.min_delay = config.get('min_delay', 0.5)  # Seconds between calls on one agent
+        # Slots are shared with the agent's background instance, which sets
+        # `background` so it only takes slots nobody else is waiting for
+        self.rate_limiter = RateLimiter()
+        self.background = False
+        self._rate_lock = threading.Lock()
+        self.wait_seconds = 0.0  # Time spent waiting for a rate-limit slot or a pooled key
+        # Optional, e.g. {"percentile": 95, "min_samples": 20, "max_hedge_ratio": 0.1}
+        self.hedge = (get_hedge_policy(self.model_name, config['hedge'])
+                      if config.get('hedge') else None)
+        self.hedge_stats = HedgeStats()  # This instance's share of the policy's counters
+        self.usage = UsageMeter()  # This instance's share of the process-wide usage counters
+        # This instance's share of the single-flight counters, updated under its lock
+        self.single_flight_stats = {"upstream_calls": 0, "shared_hits": 0}
+        # Sharing one response between callers is only safe when sampling is
+        # deterministic, so deduplication defaults to on only at temperature 0
+        self.single_flight = config.get('single_flight', self.temperature == 0)
+        # Seconds allowed per provider call; None waits indefinitely
+        self.request_timeout = config.get('request_timeout')
+        # Optional {"input": $, "output": $} per million tokens, for spend tracking
+        self.pricing = config.get('pricing')
+        # Several keys/endpoints ("api_keys" or "endpoints") share one pool per model
+        self.key_pool = get_key_pool(config)
+        # This instance's share of the pool's counters by key label, updated under the pool's lock
+        self.key_counters: Dict[str, Dict[str, int]] = {}
+
+    def _rate_limit(self, timeout: Optional[float] = None) -> Optional[float]:
+        """Wait for this instance's next request slot and return what is left of `timeout`.
+
+        Raises RequestTimeout, without taking the slot, if the wait alone
+        would use up the timeout.
+        """
+        start_time = time.time()
+        if self.background:
+            self.rate_limiter.wait_idle(self.min_delay, timeout, self.model_name)
+        else:
+            scheduled_time = self.rate_limiter.reserve(self.min_delay, timeout, self.model_name)
+            if scheduled_time > start_time:
+                with span("rate_limit_wait", "provider", model=self.model_name):
+                    time.sleep(scheduled_time - start_time)
+        waited = time.time() - start_time
+        with self._rate_lock:
+            self.wait_seconds += waited
+        return None if timeout is None else timeout - waited
+
+    def _create_client(self, api_key: str, base_url: Optional[str] = None):
+        """Provider client for one key; overridden by providers that support key pools"""
+        raise NotImplementedError(f"{type(self).__name__} does not support key pools")
 
-    def _rate_limit(self):
-        current_time = time.time()
-        time_since_last = current_time - self.last_request_time
-        if time_since_last < self.min_delay:
-            time.sleep(self.min_delay - time_since_last)
-        self.last_request_time = time.time()
+    def _with_client(self, call, timeout: Optional[float] = None):
+        """Run `call(client)`, failing over to another pooled key on quota or auth errors.
+
+        Waiting for a free key counts against `timeout`; past it, the call
+        raises RequestTimeout instead of being sent late.
+        """
+        if self.key_pool is None:
+            return call(self.client)
+
+        give_up = None if timeout is None else time.time() + timeout
+        for attempt in range(len(self.key_pool)):
+            start_time = time.time()
+            key = self.key_pool.acquire(None if give_up is None else give_up - start_time, self.key_counters)
+            with self._rate_lock:
+                self.wait_seconds += time.time() - start_time
+            try:
+                if key.client is None:
+                    key.client = self._create_client(key.api_key, key.base_url)
+                result = call(key.client)
+            except Exception as e:
+                kind = self.key_pool.release(key, e, self.key_counters)
+                if kind is None or attempt == len(self.key_pool) - 1:
+                    raise
+                continue
+            self.key_pool.release(key, caller_counters=self.key_counters)
+            return result
 
     @abstractmethod
-    def generate(self, messages: List[Dict], max_tokens: int) -> str:
-        """Generate a response from the model"""
+    def generate(self, messages: List[Dict], max_tokens: int, timeout: Optional[float] = None) -> str:
+        """Generate a response from the model, giving up after `timeout` seconds"""
         pass
 
+    def request(self,
+                messages: List[Dict],
+                max_tokens: int,
+                deadline: Optional[Deadline] = None) -> str:
+        """Generate a response, deduplicating and hedging calls as configured.
+
+        The call is bounded by `request_timeout` and by `deadline`, whichever
+        is sooner; running out of the deadline raises DeadlineExceeded.
+        """
+        timeout = self.request_timeout
+        if deadline is not None:
+            deadline.check()
+            timeout = deadline.remaining() if timeout is None else min(timeout, deadline.remaining())
+
+        try:
+            if self.single_flight:
+                key = (type(self).__name__, self.model_name, self.temperature, max_tokens,
+                       json.dumps(messages, sort_keys=True))
+                return _single_flight.do(self.model_name, key,
+                                         lambda: self._dispatch(messages, max_tokens, timeout),
+                                         timeout, self.single_flight_stats)
+            return self._dispatch(messages, max_tokens, timeout)
+        except RequestTimeout as e:
+            if deadline is not None and deadline.expired():
+                raise DeadlineExceeded(f"Game deadline of {deadline.seconds}s exceeded") from e
+            raise
+
+    def _generate(self, messages: List[Dict], max_tokens: int, timeout: Optional[float]) -> str:
+        # Only pass a timeout when one applies, so providers written against
+        # the two-argument generate() keep working
+        if timeout is None:
+            response = self.generate(messages, max_tokens)
+        else:
+            response = self.generate(messages, max_tokens, timeout)
+        input_tokens = sum(estimate_tokens(m['content']) for m in messages)
+        output_tokens = estimate_tokens(response)
+        _usage.record(self.model_name, input_tokens, output_tokens, self.pricing)
+        self.usage.record(self.model_name, input_tokens, output_tokens, self.pricing)
+        return response
+
+    def _submit(self, messages: List[Dict], max_tokens: int, timeout: Optional[float]) -> Future:
+        return _executor.submit(self._generate, messages, max_tokens, timeout)
+
+    def _dispatch(self, messages: List[Dict], max_tokens: int, timeout: Optional[float]) -> str:
+        if self.hedge is not None:
+            return self._hedged_generate(messages, max_tokens, timeout)
+        if timeout is None:
+            return self._generate(messages, max_tokens, None)
+
+        # Wait on a worker so the call is abandoned on time even if the
+        # provider SDK ignores its own timeout
+        future = self._submit(messages, max_tokens, timeout)
+        try:
+            return future.result(timeout=timeout)
+        except RequestTimeout:
+            # Raised by the call itself, e.g. no pooled key was free in time
+            # (FuturesTimeoutError is the builtin TimeoutError on Python 3.11+)
+            raise
+        except FuturesTimeoutError:
+            future.cancel()
+            raise RequestTimeout(f"{self.model_name} did not respond within {timeout:.1f}s")
+
+    def _hedged_generate(self, messages: List[Dict], max_tokens: int, timeout: Optional[float]) -> str:
+        policy = self.hedge
+        policy.record_request()
+        self.hedge_stats.record_request()
+        start_time = time.time()
+        hedge_start = None
+
+        def record_primary(future):
+            # For reporting only: what the call would have taken unhedged,
+            # known once a losing primary finally returns
+            if not future.cancelled() and future.exception() is None:
+                policy.record_primary(time.time() - start_time)
+                self.hedge_stats.record_primary(time.time() - start_time)
+
+        def time_left() -> Optional[float]:
+            return None if timeout is None else max(0.0, timeout - (time.time() - start_time))
+
+        primary = self._submit(messages, max_tokens, timeout)
+        primary.add_done_callback(record_primary)
+        pending = {primary}
+
+        delay = policy.hedge_delay()
+        if delay is not None and (timeout is None or delay < timeout):
+            done, _ = wait(pending, timeout=delay)
+            if not done and policy.try_hedge():
+                self.hedge_stats.record_hedge()
+                hedge_start = time.time() - start_time
+                pending.add(self._submit(messages, max_tokens, time_left()))
+
+        # First good response wins; only fail once every attempt has failed
+        error = None
+        while pending:
+            done, pending = wait(pending, timeout=time_left(), return_when=FIRST_COMPLETED)
+            if not done:
+                for future in pending:
+                    future.cancel()
+                raise RequestTimeout(f"{self.model_name} did not respond within {timeout:.1f}s")
+            for future in done:
+                if future.exception() is None:
+                    latency = time.time() - start_time
+                    hedge_won = future is not primary
+                    # A loser that has not started is dropped; one already
+                    # sent runs to completion and is still billed
+                    for other in pending:
+                        other.cancel()
+                    # Sample the threshold as the call resolves. A hedge win
+                    # adds its own latency and the primary's latency so far
+                    # (a lower bound), so slow primaries still count.
+                    if hedge_won:
+                        policy.record_latency(latency - hedge_start)
+                    policy.record_latency(latency)
+                    policy.record_result(latency, hedge_won=hedge_won)
+                    self.hedge_stats.record_result(latency, hedge_won=hedge_won)
+                    return future.result()
+                error = future.exception()
+        raise error
+
 class OpenAILLM(BaseLLM):
     def __init__(self, config: Dict):
         super().__init__(config)
-        self.client = openai.OpenAI(api_key=config['api_key'])
-        self.model_name = config['model_name']
+        if self.key_pool is None:
+            self.client = self._create_client(config['api_key'], config.get('base_url'))
+
+    def _create_client(self, api_key: str, base_url: Optional[str] = None):
+        return openai.OpenAI(api_key=api_key, base_url=base_url)
 
-    def generate(self, messages: List[Dict], max_tokens: int) -> str:
-        self._rate_limit()
-        response = self.client.chat.completions.create(
+    def generate(self, messages: List[Dict], max_tokens: int, timeout: Optional[float] = None) -> str:
+        timeout = self._rate_limit(timeout)
+        response = self._with_client(lambda client: client.chat.completions.create(
             model=self.model_name,
             messages=messages,
             temperature=self.temperature,
-            max_tokens=max_tokens
-        )
+            max_tokens=max_tokens,
+            **({'timeout': timeout} if timeout is not None else {})
+        ), timeout)
         return response.choices[0].message.content.strip()
 
 # in llm_providers.py, update the GeminiLLM class
 
+# genai holds one global key configuration, so binding a model to a key is
+# serialized; the lock is only held to configure and build a client, never across a request
+_gemini_configure_lock = threading.Lock()
+
 class GeminiLLM(BaseLLM):
     def __init__(self, config: Dict):
         super().__init__(config)
-        genai.configure(api_key=config['api_key'])
-        self.client = genai.GenerativeModel(config['model_name'])
+        if self.key_pool is None:
+            self.client = self._create_client(config['api_key'], config.get('base_url'))
         self.generation_config = genai.types.GenerationConfig(
             temperature=self.temperature,
             candidate_count=1,
@@ -57,8 +726,9 @@ class GeminiLLM(BaseLLM):
             top_k=40,
         )
 
-    def generate(self, messages: List[Dict], max_tokens: int) -> str:
-        self._rate_limit()
+    def generate(self, messages: List[Dict], max_tokens: int, timeout: Optional[float] = None) -> str:
+        timeout = self._rate_limit(timeout)
+        call_start = time.time()
         try:
             # Convert OpenAI-style messages to Gemini format
             prompt = self._convert_messages(messages)
@@ -69,11 +739,12 @@ class GeminiLLM(BaseLLM):
                 "HARM_CATEGORY_DANGEROUS_CONTENT": "BLOCK_NONE",
             }
             
-            response = self.client.generate_content(
+            response = self._with_client(lambda client: client.generate_content(
                 prompt,
                 generation_config=self.generation_config,
-                safety_settings=safety_settings
-            )
+                safety_settings=safety_settings,
+                **({'request_options': {'timeout': timeout}} if timeout is not None else {})
+            ), timeout)
             
             if hasattr(response, 'text'):
                 return response.text.strip()
@@ -82,11 +753,30 @@ class GeminiLLM(BaseLLM):
             
         except Exception as e:
             if 'Resource has been exhausted' in str(e):
-                # Add longer delay for quota errors
-                time.sleep(5)
+                # Add longer delay for quota errors, but never past the call's timeout
+                delay = 5
+                if timeout is not None:
+                    remaining = timeout - (time.time() - call_start)
+                    if remaining <= delay:
+                        time.sleep(max(remaining, 0))
+                        raise RequestTimeout(f"{self.model_name} quota exceeded and no time left within {timeout:.1f}s")
+                time.sleep(delay)
                 raise Exception("Quota exceeded, please wait")
             raise e
 
+    def _create_client(self, api_key: str, base_url: Optional[str] = None):
+        configure = {'api_key': api_key}
+        if base_url:
+            configure['client_options'] = {'api_endpoint': base_url}
+        model = genai.GenerativeModel(self.model_name)
+        # A model otherwise picks up whatever key is configured at its first
+        # request, so give it this key's client now. Building the client does
+        # not touch the network.
+        with _gemini_configure_lock:
+            genai.configure(**configure)
+            model._client = genai_client.get_default_generative_client()
+        return model
+
     def _convert_messages(self, messages: List[Dict]) -> str:
         prompt = ""
         for msg in messages:
@@ -104,16 +794,19 @@ class GeminiLLM(BaseLLM):
 class ClaudeLLM(BaseLLM):
     def __init__(self, config: Dict):
         super().__init__(config)
-        self.client = Anthropic(api_key=config['api_key'])
-        self.model_name = config['model_name']
+        if self.key_pool is None:
+            self.client = self._create_client(config['api_key'], config.get('base_url'))
 
-    def generate(self, messages: List[Dict], max_tokens: int) -> str:
-        self._rate_limit()
+    def _create_client(self, api_key: str, base_url: Optional[str] = None):
+        return Anthropic(api_key=api_key, base_url=base_url)
+
+    def generate(self, messages: List[Dict], max_tokens: int, timeout: Optional[float] = None) -> str:
+        timeout = self._rate_limit(timeout)
         # Convert OpenAI-style messages to Claude format
         system_prompt = next((m['content'] for m in messages if m['role'] == 'system'), "")
         conversation = [m for m in messages if m['role'] != 'system']
         
-        response = self.client.messages.create(
+        response = self._with_client(lambda client: client.messages.create(
             model=self.model_name,
             system=system_prompt,
             messages=[{
@@ -121,8 +814,9 @@ class ClaudeLLM(BaseLLM):
                 'content': m['content']
             } for m in conversation],
             max_tokens=max_tokens,
-            temperature=self.temperature
-        )
+            temperature=self.temperature,
+            **({'timeout': timeout} if timeout is not None else {})
+        ), timeout)
         return response.content[0].text.strip()
 
 # Factory function to create LLM instances
@@ -1,8 +1,10 @@
 # main.py
 
 import os
+import sys
 from dotenv import load_dotenv
 from benchmark import CodeNamesBenchmark
+from budget import estimate_matchup
 import json
 
 def main():
@@ -44,6 +46,18 @@ def main():
     team_a = "gpt4"
     team_b = "gemini"
     
+    # Projected usage before any API calls; `python main.py --dry-run` stops here
+    estimate = estimate_matchup(model_configs[team_a], model_configs[team_b], num_games=3,
+                                speculative_clues=benchmark.speculative_clues)
+    print(f"\n=== Estimate ===")
+    print(f"Calls: {sum(m['calls'] for m in estimate['models'].values())}")
+    print(f"Tokens: {estimate['total_tokens']}")
+    if estimate['total_cost'] is not None:
+        print(f"Cost: ${estimate['total_cost']:.2f}")
+    print(f"Wall clock: {estimate['wall_clock_seconds'] / 60:.1f} min")
+    if "--dry-run" in sys.argv:
+        return
+
     try:
         print(f"\n=== Starting 2v2 Match ===")
         print(f"Team A ({team_a}): Codemaster + Guesser")
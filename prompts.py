@@ -1,6 +1,10 @@
 # prompts.py
 # prompts.py
 
+import math
+import re
+from collections import namedtuple
+
 CODEMASTER_SYSTEM_PROMPT = """You are playing as the Codemaster in Codenames. Your role is to give clues that will help your team guess specific words while avoiding opponent's words, neutral words, and especially the assassin word.
 
 Rules for giving clues:
@@ -19,16 +23,79 @@ Example response:
 fruit
 2"""
 
+RESULT_CODES = {"team word": "T", "opponent word": "O", "neutral": "N", "assassin": "X"}
+
+# Compression levels for the game history, least to most compact:
+# 0 prose, 1 one table row per turn, 2 last few turns as rows with older
+# clues listed, 3 last two turns as rows with older turns reduced to counts
+HISTORY_LEVELS = 4
+
+HistoryRender = namedtuple("HistoryRender", ["text", "level", "full_tokens", "tokens"])
+
+def estimate_tokens(text: str) -> int:
+    """Rough local token count: about one token per 4 characters of each word or symbol"""
+    return sum(math.ceil(len(piece) / 4) for piece in re.findall(r"\w+|[^\w\s]", text))
+
+def _history_row(turn: dict) -> str:
+    guesses = ",".join(f"{g}={RESULT_CODES.get(r, '?')}" for g, r in zip(turn['guesses'], turn['results']))
+    return f"{turn['turn_number']}|{turn['team'][-1]}|{turn['clue_word']} {turn['clue_number']}|{guesses}"
+
+def _history_table(turns: list) -> list:
+    return ["turn|team|clue|guesses (T=team O=opponent N=neutral X=assassin)"] + [_history_row(t) for t in turns]
+
+def format_game_history(past_turns: list, level: int = 0) -> str:
+    if not past_turns:
+        return "No turns played yet"
+
+    if level == 0:
+        # Format past guesses into a readable history
+        guess_history = []
+        for turn in past_turns:
+            guess_history.append(
+                f"Turn {turn['turn_number']} - {turn['team']}: "
+                f"Clue '{turn['clue_word']} {turn['clue_number']}' → "
+                f"Guesses: {', '.join([f'{g} ({r})' for g, r in zip(turn['guesses'], turn['results'])])}"
+            )
+        return chr(10).join(guess_history)
+
+    if level == 1:
+        return chr(10).join(_history_table(past_turns))
+
+    recent = 4 if level == 2 else 2
+    older, latest = past_turns[:-recent], past_turns[-recent:]
+    lines = []
+    if older:
+        span = f"Turns {older[0]['turn_number']}-{older[-1]['turn_number']}"
+        for team in sorted({t['team'] for t in older}):
+            team_turns = [t for t in older if t['team'] == team]
+            if level == 2:
+                clues = ", ".join(f"{t['clue_word']} {t['clue_number']}" for t in team_turns)
+                lines.append(f"{span} {team} clues: {clues}")
+            else:
+                results = [r for t in team_turns for r in t['results']]
+                lines.append(f"{span} {team}: {len(team_turns)} clues, "
+                             f"{results.count('team word')} correct, "
+                             f"{len(results) - results.count('team word')} wrong")
+    return chr(10).join(lines + _history_table(latest))
+
+def render_history(past_turns: list, token_budget: int = None) -> HistoryRender:
+    """Render the history at the least compressed level that fits `token_budget`"""
+    full_text = format_game_history(past_turns)
+    full_tokens = estimate_tokens(full_text)
+    if token_budget is None or full_tokens <= token_budget:
+        return HistoryRender(full_text, 0, full_tokens, full_tokens)
+
+    for level in range(1, HISTORY_LEVELS):
+        text = format_game_history(past_turns, level)
+        tokens = estimate_tokens(text)
+        if tokens <= token_budget or level == HISTORY_LEVELS - 1:
+            return HistoryRender(text, level, full_tokens, tokens)
+
 def get_codemaster_prompt(team: str, team_words: list, neutral_words: list, 
-                         opponent_words: list, assassin: str, game_state: dict) -> str:
-    # Format past guesses into a readable history
-    guess_history = []
-    for turn in game_state["past_turns"]:
-        guess_history.append(
-            f"Turn {turn['turn_number']} - {turn['team']}: "
-            f"Clue '{turn['clue_word']} {turn['clue_number']}' → "
-            f"Guesses: {', '.join([f'{g} ({r})' for g, r in zip(turn['guesses'], turn['results'])])}"
-        )
+                         opponent_words: list, assassin: str, game_state: dict,
+                         history: str = None) -> str:
+    if history is None:
+        history = format_game_history(game_state["past_turns"])
 
     return f"""You are the Codemaster for {team}. Here is the current game state:
 
@@ -38,7 +105,7 @@ Neutral words (avoid these): {', '.join(neutral_words)}
 Assassin word (CRITICAL to avoid): {assassin}
 
 Game History:
-{chr(10).join(guess_history) if guess_history else "No turns played yet"}
+{history}
 
 Your team has {len(team_words)} words left to guess.
 
@@ -64,21 +131,21 @@ Rules for guessing:
 
 You must respond with exactly one word from the board that you think matches the clue."""
 
-def get_guesser_prompt(team: str, board: list, clue: str, number: int, game_state: dict) -> str:
-    # Format past guesses into a readable history
-    guess_history = []
-    for turn in game_state["past_turns"]:
-        guess_history.append(
-            f"Turn {turn['turn_number']} - {turn['team']}: "
-            f"Clue '{turn['clue_word']} {turn['clue_number']}' → "
-            f"Guesses: {', '.join([f'{g} ({r})' for g, r in zip(turn['guesses'], turn['results'])])}"
-        )
-    
+def get_guesser_prompt(team: str, board: list, clue: str, number: int, game_state: dict,
+                       feedback: list = None, history: str = None) -> str:
+    if history is None:
+        history = format_game_history(game_state["past_turns"])
+
     # Get already guessed words (confirmed role)
     guessed_team_words = [word for turn in game_state["past_turns"] 
                          if turn["team"] == team 
                          for word, result in zip(turn["guesses"], turn["results"])
                          if result == "team word"]
+
+    # Feedback on guesses since the last prompt, when buffered by the agent
+    feedback_section = ""
+    if feedback:
+        feedback_section = "\nFeedback on your previous guesses:\n" + "\n".join(feedback) + "\n"
                          
     return f"""You are the Guesser for {team}.
 
@@ -89,8 +156,8 @@ Your Codemaster's clue is: {clue} {number}
 This means there are {number} words on the board related to '{clue}'
 
 Game History:
-{chr(10).join(guess_history) if guess_history else "No turns played yet"}
-
+{history}
+{feedback_section}
 Your team has found these words so far: {', '.join(guessed_team_words)}
 
 Already guessed words this turn: {', '.join(game_state["current_turn_guesses"])}
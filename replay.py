@@ -0,0 +1,118 @@
+# replay.py
+
+import copy
+from typing import Dict, List, Union
+from game_logger import GameLog, load_game_log
+
+
+def _classify_guess(guess: str, team: str, game_log: GameLog) -> str:
+    """Work out a guess's result from the initial role split (for old logs without results)"""
+    own_words = game_log.team_a_words if team == "A" else game_log.team_b_words
+    other_words = game_log.team_b_words if team == "A" else game_log.team_a_words
+    if guess in own_words:
+        return "team word"
+    if guess == game_log.assassin:
+        return "assassin"
+    if guess in other_words:
+        return "opponent word"
+    return "neutral"
+
+
+def build_snapshot(game_log: GameLog, turn: int) -> Dict:
+    """Rebuild the exact game state after `turn` turns of a recorded game.
+
+    The result can be passed to `CodeNamesBenchmark.simulate_game(snapshot=...)`
+    to continue play from that point without re-requesting the earlier turns.
+    """
+    prefix = [t for t in game_log.turns if t.turn_number <= turn]
+    team_words = {"A": list(game_log.team_a_words), "B": list(game_log.team_b_words)}
+    neutral_words = list(game_log.neutral_words)
+    guessed_words = set()
+    past_turns = []
+    team_metrics = {
+        "A": {"correct_guesses": 0, "incorrect_guesses": 0, "total_clues": 0, "guesses_per_clue": []},
+        "B": {"correct_guesses": 0, "incorrect_guesses": 0, "total_clues": 0, "guesses_per_clue": []}
+    }
+
+    for logged_turn in prefix:
+        team = logged_turn.team[-1]
+        other = "B" if team == "A" else "A"
+        results = logged_turn.results or [_classify_guess(g, team, game_log) for g in logged_turn.guesses]
+
+        for guess, result in zip(logged_turn.guesses, results):
+            if result == "assassin":
+                raise ValueError(f"Game {game_log.game_id} ended on turn {logged_turn.turn_number}")
+            if result == "team word":
+                team_words[team].remove(guess)
+                team_metrics[team]["correct_guesses"] += 1
+            else:
+                (team_words[other] if result == "opponent word" else neutral_words).remove(guess)
+                team_metrics[team]["incorrect_guesses"] += 1
+            guessed_words.add(guess)
+
+        team_metrics[team]["total_clues"] += 1
+        team_metrics[team]["guesses_per_clue"].append(len(logged_turn.guesses))
+        past_turns.append({
+            "turn_number": logged_turn.turn_number,
+            "team": logged_turn.team,
+            "clue_word": logged_turn.clue_word,
+            "clue_number": logged_turn.clue_number,
+            "guesses": list(logged_turn.guesses),
+            "results": list(results)
+        })
+
+    if not team_words["A"] or not team_words["B"]:
+        raise ValueError(f"Game {game_log.game_id} was already won by turn {turn}")
+
+    return {
+        "source_game_id": game_log.game_id,
+        "layout": {
+            "board_index": game_log.board_index,
+            "board": list(game_log.initial_board),
+            "team_a_words": list(game_log.team_a_words),
+            "team_b_words": list(game_log.team_b_words),
+            "neutral_words": list(game_log.neutral_words),
+            "assassin": game_log.assassin,
+            "difficulty": game_log.board_difficulty,
+        },
+        "team_a_words": team_words["A"],
+        "team_b_words": team_words["B"],
+        "neutral_words": neutral_words,
+        "guessed_words": guessed_words,
+        "past_turns": past_turns,
+        "team_metrics": team_metrics,
+        "turn_count": turn,
+        # Teams alternate every turn, including turns lost to an invalid clue
+        "current_team": "A" if turn % 2 == 0 else "B",
+        "prior_turns": prefix,
+    }
+
+
+def fork_game(benchmark,
+              game_log: Union[GameLog, str],
+              turn: int,
+              team_a_config: Dict,
+              team_b_config: Dict,
+              variants: List[Dict]) -> List[Dict]:
+    """Play several continuations of a recorded game from the end of `turn`.
+
+    Each variant may hold "team_a" and/or "team_b" dicts of config overrides
+    (model, temperature, "codemaster_system_prompt", ...) and an optional
+    "name". Only the turns after the fork point cost API calls.
+    """
+    if isinstance(game_log, str):
+        game_log = load_game_log(game_log)
+    snapshot = build_snapshot(game_log, turn)
+
+    forks = []
+    for i, variant in enumerate(variants):
+        variant_a = {**team_a_config, **variant.get("team_a", {})}
+        variant_b = {**team_b_config, **variant.get("team_b", {})}
+        game_id = f"{game_log.game_id}_t{turn}_v{i}"
+        results = benchmark.simulate_game(game_id, variant_a, variant_b, snapshot=copy.deepcopy(snapshot))
+        forks.append({
+            "variant": variant.get("name", f"v{i}"),
+            "game_id": game_id,
+            "results": results
+        })
+    return forks
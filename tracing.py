@@ -0,0 +1,130 @@
+# tracing.py
+
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, List
+
+
+class _NullSpan:
+    """Shared no-op span handed out while tracing is disabled"""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class _Span:
+    def __init__(self, tracer: "Tracer", name: str, category: str, args: Dict):
+        self.tracer = tracer
+        self.name = name
+        self.category = category
+        self.args = args
+        self.generation = tracer.generation
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is not None:
+            self.args["error"] = exc_type.__name__
+        self.tracer._record(self.name, self.category, self.start, time.perf_counter(), self.args,
+                            self.generation)
+        return False
+
+
+class Tracer:
+    """Collects timed spans and exports them as Chrome trace event JSON.
+
+    The output loads directly in Perfetto (ui.perfetto.dev) or
+    chrome://tracing. When disabled, `span` returns a shared no-op object,
+    so instrumented code pays only for the call and an attribute check.
+
+    `clear` and `export` start a new generation; spans opened before then
+    and closed after (e.g. by a background thread) are dropped rather than
+    landing in the next export.
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self.events: List[Dict] = []
+        self.generation = 0
+        self.lock = threading.Lock()
+        self._origin = time.perf_counter()
+
+    def span(self, name: str, category: str = "", **args):
+        if not self.enabled:
+            return _NULL_SPAN
+        return _Span(self, name, category, args)
+
+    def _record(self, name: str, category: str, start: float, end: float, args: Dict, generation: int):
+        event = {
+            "name": name,
+            "cat": category,
+            "ph": "X",
+            "ts": (start - self._origin) * 1e6,
+            "dur": (end - start) * 1e6,
+            "pid": os.getpid(),
+            "tid": threading.get_ident(),
+            "args": args,
+        }
+        with self.lock:
+            if generation == self.generation:
+                self.events.append(event)
+
+    def clear(self):
+        with self.lock:
+            self.events = []
+            self.generation += 1
+
+    def export(self, path: str, clear: bool = True):
+        """Write collected spans to `path`, labelling each thread by name"""
+        with self.lock:
+            events = self.events
+            if clear:
+                self.events = []
+                self.generation += 1
+
+        thread_names = {t.ident: t.name for t in threading.enumerate()}
+        metadata = [
+            {"name": "thread_name", "ph": "M", "pid": os.getpid(), "tid": tid,
+             "args": {"name": thread_names.get(tid, str(tid))}}
+            for tid in sorted({e["tid"] for e in events})
+        ]
+        with open(path, "w") as f:
+            json.dump({"traceEvents": metadata + events, "displayTimeUnit": "ms"}, f)
+
+
+tracer = Tracer()
+
+
+def span(name: str, category: str = "", **args):
+    """Time a block with the global tracer: `with span("turn", team="A"): ...`"""
+    return tracer.span(name, category, **args)
+
+
+def enable_tracing():
+    tracer.enabled = True
+
+
+def disable_tracing():
+    tracer.enabled = False
+
+
+@contextmanager
+def tracing(enabled: bool = True):
+    """Trace a block if `enabled`, then put the global tracer back as it was"""
+    previous = tracer.enabled
+    tracer.enabled = previous or enabled
+    try:
+        yield tracer
+    finally:
+        tracer.enabled = previous